@@ -0,0 +1,29 @@
+# Núcleo de ATS Genius sin la interfaz: extracción de PDF, métricas, prompts y llamadas a Gemini.
+# Los nombres públicos se cargan al primer uso, así importar el paquete no arrastra dependencias pesadas.
+import importlib
+
+_EXPORTS = {
+    "ResumeDocument": "ingestion",
+    "PdfParserPool": "ingestion",
+    "load_resume_document": "ingestion",
+    "extract_text_from_pdf": "ingestion",
+    "calculate_metrics": "ingestion",
+    "clean_resume_text": "prompts",
+    "build_job_description_prompt": "prompts",
+    "build_ats_general_prompt": "prompts",
+    "score_document": "scoring",
+    "analyze_resume": "analysis",
+    "get_suggestions_from_gemini": "analysis",
+    "process_pdf": "analysis",
+    "process_based_on_option": "analysis",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,664 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import history, metrics, revisions
+from .cache import ResultCache, make_cache_key
+from .clients import GeminiClientPool
+from .duplicates import DuplicateIndex, format_duplicate_note, minhash_signature
+from .highlights import HIGHLIGHT_DPI, HighlightedDocument, PageImageCache, collect_highlights
+from .history import AnalysisHistory
+from .ingestion import PdfParserPool, read_pdf_bytes
+from .prompts import (
+    ATS_GENERAL_SECTIONS, ATS_GENERAL_SYSTEM_INSTRUCTION, EVALUATION_CATEGORY, INTERVIEW_CATEGORY, INTERVIEW_MIN_FIT,
+    JOB_DESCRIPTION_SECTIONS, JOB_DESCRIPTION_SYSTEM_INSTRUCTION, PROMPT_VERSION, RUBRIC_CATEGORIES,
+    build_ats_general_prompt, build_category_prompt, build_interview_prompt, build_job_description_prompt,
+    clean_resume_text, split_resume_sections,
+)
+from .rubric import category_scores, fit_score, format_parallel_report, parse_category_response
+from .scheduler import RequestScheduler, estimate_tokens
+from .scoring import format_local_facts, format_overall_section, parse_llm_scores, score_document
+
+logger = logging.getLogger("ats_genius")
+
+# Modelo de Gemini (forma parte de la clave de la caché junto con PROMPT_VERSION)
+GEMINI_MODEL = "gemini-1.5-flash"
+
+# Caché persistente de resultados compartida por todas las sesiones
+result_cache = ResultCache()
+
+# Historial de análisis; se escribe desde un hilo propio y se vacía al salir
+history_store = AnalysisHistory()
+atexit.register(history_store.close)
+
+# Firmas MinHash de los CV ya analizados, para reutilizar el informe de un CV casi idéntico (modo por lotes)
+duplicate_index = DuplicateIndex()
+
+# Clientes de Gemini por clave API, compartidos por los hilos de la cola de Gradio
+gemini_pool = GeminiClientPool()
+
+# Procesos que analizan los PDF fuera de los hilos de Gradio (límites de tamaño, páginas y tiempo)
+pdf_parser = PdfParserPool()
+atexit.register(pdf_parser.close)
+
+# Páginas ya renderizadas con los errores resaltados (pasar de página no vuelve a rasterizar)
+page_images = PageImageCache()
+
+# Planificador compartido de llamadas a Gemini (cuotas por clave, reintentos y coalescencia)
+request_scheduler = RequestScheduler()
+
+# Mensaje que sustituye al informe cuando el análisis no se pudo hacer (PDF ilegible, campos vacíos, error de
+# Gemini). Se muestra como cualquier texto, pero el estado del análisis sale del tipo y no del contenido.
+class ErrorMessage(str):
+    __slots__ = ()
+
+# Progreso vacío para cuando no hay barra de Gradio que actualizar (lotes, benchmarks, workers)
+def no_progress(*args, **kwargs):
+    pass
+
+# Tokens de salida que se reservan en la cuota por cada informe
+OUTPUT_TOKEN_ESTIMATE = 2048
+
+# Análisis en paralelo: la rúbrica se divide en peticiones por categoría con respuestas JSON pequeñas.
+# Se activa por petición o, por defecto, con ATS_PARALLEL_RUBRIC=1.
+PARALLEL_RUBRIC = os.environ.get("ATS_PARALLEL_RUBRIC", "").lower() in ("1", "true", "yes", "on")
+CATEGORY_OUTPUT_TOKEN_ESTIMATE = 512
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+# Re-análisis incremental: si el mismo CV (por contacto o sesión) ya se analizó contra la misma oferta,
+# se usa el análisis por categorías para reutilizar las que no dependen de las secciones modificadas
+INCREMENTAL_REANALYSIS = os.environ.get("ATS_INCREMENTAL", "1").lower() in ("1", "true", "yes", "on")
+
+# Hilos compartidos para las peticiones por categoría de todas las sesiones (se crean al primer uso)
+FANOUT_WORKERS = int(os.environ.get("ATS_FANOUT_WORKERS", 16))
+_fanout_executor = None
+_fanout_lock = threading.Lock()
+
+def _fanout():
+    global _fanout_executor
+    with _fanout_lock:
+        if _fanout_executor is None:
+            _fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="ats-fanout")
+        return _fanout_executor
+
+# Función para describir el CV (métricas y diseño) en el bloque de información adicional del prompt
+def describe_document(document):
+    info = f"""
+        - Número de palabras: {document.word_count}
+        - Tamaño del archivo: {document.file_size_mb:.2f} MB
+        - Número de páginas: {document.page_count}"""
+    if len(document.pages) < document.page_count:
+        info += f" (sólo se analizaron las primeras {len(document.pages)})"
+
+    metadata = document.metadata or {}
+    if metadata.get("title"):
+        info += f"\n        - Título del documento: {metadata.get('title')}"
+    if metadata.get("author"):
+        info += f"\n        - Autor: {metadata.get('author')}"
+
+    total_chars = sum(document.fonts.values()) or 1
+    fonts = ", ".join(f"{name} ({count * 100 // total_chars}%)" for name, count in list(document.fonts.items())[:5])
+    info += f"\n        - Fuentes usadas: {fonts or 'no detectadas'}"
+    colors = ", ".join(list(document.colors)[:5])
+    info += f"\n        - Colores de texto: {len(document.colors)} ({colors or 'no detectados'})"
+    info += f"\n        - Disposición: {document.column_count} columna(s), {document.block_count} bloques de texto, {document.image_count} imagen(es)"
+    return info
+
+# Configuración de Gemini API: el modelo se obtiene del pool de la clave, sin estado global compartido
+def configure_gemini(api_key, system_instruction=None):
+    try:
+        # La rúbrica estática va como instrucción de sistema y no se repite dentro de cada prompt
+        return gemini_pool.get_model(api_key, GEMINI_MODEL, system_instruction)
+    except Exception as e:
+        return ErrorMessage(f"Error al configurar Gemini API: {e}")
+
+# Función para registrar los tokens de cada llamada (prompt, en caché y generados)
+def log_token_usage(response, trace=metrics.NULL_TRACE):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    logger.info(
+        "Tokens Gemini: prompt=%s, cacheados=%s, salida=%s, total=%s",
+        prompt_tokens, cached_tokens, output_tokens, getattr(usage, "total_token_count", 0),
+    )
+    metrics.increment("ats_gemini_tokens_total", prompt_tokens, kind="prompt")
+    metrics.increment("ats_gemini_tokens_total", cached_tokens, kind="cached")
+    metrics.increment("ats_gemini_tokens_total", output_tokens, kind="output")
+    trace.add("prompt_tokens", prompt_tokens)
+    trace.add("cached_tokens", cached_tokens)
+    trace.add("output_tokens", output_tokens)
+
+# Función para transmitir la respuesta de Gemini al UI a medida que llegan los fragmentos.
+# La llamada pasa por el planificador: cuota por clave, reintentos y peticiones idénticas compartidas.
+def stream_gemini(gemini_model, prompt, sections, progress, api_key, flight_key, estimated_tokens, trace=metrics.NULL_TRACE):
+    progress(0.15, desc="Esperando la primera respuesta de Gemini...")
+    started = time.perf_counter()
+    
+    def call(timeout):
+        response = gemini_model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+        for chunk in response:
+            try:
+                piece = chunk.text
+            except ValueError:
+                # Fragmentos sin texto (por ejemplo, sólo metadatos de finalización)
+                continue
+            if piece:
+                yield piece
+        log_token_usage(response, trace)
+    
+    chunks = []
+    lowered = ""
+    next_section = 0
+    search_from = 0
+    for piece in request_scheduler.stream(api_key, flight_key, call, estimated_tokens + OUTPUT_TOKEN_ESTIMATE, trace):
+        if not chunks:
+            trace.record_stage("gemini_first_chunk", time.perf_counter() - started)
+        chunks.append(piece)
+        
+        # El avance se mide por los encabezados del informe que ya han aparecido
+        lowered += piece.lower()
+        for index in range(len(sections) - 1, next_section - 1, -1):
+            if lowered.find(sections[index].lower(), search_from) >= 0:
+                next_section = index + 1
+                progress(0.15 + 0.85 * next_section / (len(sections) + 1), desc=f"Generando: {sections[index]}")
+                break
+        search_from = max(0, len(lowered) - 64)
+        
+        yield "".join(chunks)
+
+# Función de adecuación del currículum a la descripción del puesto con análisis avanzado
+def analyze_resume(job_description, document, api_key, progress=no_progress, trace=metrics.NULL_TRACE, parallel=None, session_id=None,
+                   reuse_duplicates=False, local_reports=None):
+    if document is None:
+        yield ErrorMessage("Por favor, cargue un currículum válido primero.")
+        return
+    
+    if not job_description:
+        yield ErrorMessage("Por favor, proporcione una descripción del puesto.")
+        return
+    
+    if not api_key:
+        yield ErrorMessage("Por favor, proporcione una clave API de Gemini válida.")
+        return
+    
+    resume_text = document.text
+    parallel = PARALLEL_RUBRIC if parallel is None else parallel
+    revision = revisions.revision_key(resume_text, session_id, job_description, "job_description")
+    
+    # Un mismo CV contra la misma oferta no vuelve a consumir cuota de la API, se analice en un modo o en el otro
+    cache_keys = {
+        mode: make_cache_key(resume_text, job_description, mode, GEMINI_MODEL, PROMPT_VERSION)
+        for mode in ("job_description", "job_description_parallel")
+    }
+    preferred_mode = "job_description_parallel" if parallel else "job_description"
+    with trace.stage("cache_lookup"):
+        for mode in sorted(cache_keys, key=lambda mode: mode != preferred_mode):
+            cache_key = cache_keys[mode]
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                break
+    metrics.increment("ats_cache_requests_total", result="miss" if cached is None else "hit")
+    trace.set(cache_hit=cached is not None)
+    if cached is not None:
+        progress(1.0, desc="Resultado recuperado de la caché")
+        yield with_revision_delta(cached, trace, revision, revisions.load_snapshot(result_cache, cache_key))
+        return
+    
+    # Una nueva versión de un CV ya analizado sólo vuelve a pedir las categorías afectadas por los cambios.
+    # Si la última versión registrada es este mismo texto (su informe ya no está en la caché), no hay cambios
+    # que aprovechar y se analiza de nuevo en el modo pedido.
+    latest = revisions.load_revision(result_cache, revision) if INCREMENTAL_REANALYSIS and revision is not None else None
+    incremental = latest is not None and (latest.get("current") or {}).get("cache_key") not in cache_keys.values()
+    parallel = parallel or incremental
+    trace.set(incremental=incremental)
+    mode = "job_description_parallel" if parallel else "job_description"
+    cache_key = cache_keys[mode]
+    
+    # En lote, un CV casi idéntico a otro ya analizado con la misma oferta reutiliza su informe
+    signature = minhash_signature(resume_text) if reuse_duplicates else None
+    reused_report = reuse_near_duplicate(signature, job_description, "job_description", trace)
+    if reused_report is not None:
+        progress(1.0, desc="Informe reutilizado de un CV casi idéntico")
+        yield reused_report
+        return
+    
+    with trace.stage("prompt_build"):
+        # Información adicional que podemos incluir gracias a PyMuPDF
+        additional_info = describe_document(document)
+        
+        # Informes mecánicos calculados localmente (si no llegan ya calculados): entran en el prompt como hechos
+        local_reports = local_reports if local_reports is not None else score_document(document)
+        local_facts = format_local_facts(local_reports)
+        
+        cleaned_text = clean_resume_text(document.pages)
+        prompt_job_desc = build_job_description_prompt(cleaned_text, job_description, additional_info, local_facts)
+    
+    if parallel:
+        outcome = yield from analyze_in_parallel(
+            prompt_job_desc, local_reports, api_key, cache_key, progress, trace, cleaned_text, job_description,
+        )
+        if outcome is not None:
+            text, llm_scores, reused = outcome
+            yield finish_analysis(text, trace, revision, cache_key, cleaned_text, local_reports, llm_scores, reused)
+            register_duplicate(signature, resume_text, job_description, "job_description", cache_key)
+        return
+    
+    progress(0.1, desc="Iniciando análisis avanzado...")
+    
+    with trace.stage("configure_gemini"):
+        gemini_model = configure_gemini(api_key, JOB_DESCRIPTION_SYSTEM_INSTRUCTION)
+    if isinstance(gemini_model, str):  # Es un mensaje de error
+        yield gemini_model
+        return
+    
+    text = ""
+    try:
+        estimated_tokens = estimate_tokens(JOB_DESCRIPTION_SYSTEM_INSTRUCTION, prompt_job_desc)
+        trace.set(estimated_prompt_tokens=estimated_tokens)
+        with trace.stage("gemini_generate"):
+            for text in stream_gemini(gemini_model, prompt_job_desc, JOB_DESCRIPTION_SECTIONS, progress, api_key, cache_key, estimated_tokens, trace):
+                yield text
+    except Exception as e:
+        yield ErrorMessage(f"Error al consultar Gemini API: {e}")
+        return
+    
+    # La puntuación general ponderada se calcula aquí con los puntajes locales y los de Gemini
+    with trace.stage("postprocess"):
+        llm_scores, report = parse_llm_scores(text)
+        text = format_overall_section(local_reports, llm_scores) + "\n\n" + report
+    yield finish_analysis(text, trace, revision, cache_key, cleaned_text, local_reports, llm_scores)
+    with trace.stage("cache_store"):
+        result_cache.put(cache_key, text)
+    register_duplicate(signature, resume_text, job_description, "job_description", cache_key)
+    progress(1.0, desc="Análisis completado")
+
+# Función para anteponer al informe los cambios respecto a la versión anterior del mismo CV.
+# El informe de la caché nunca incluye esta sección: depende de qué versión se analizó antes.
+# Los puntajes quedan además en la traza, de donde los toma el historial.
+def with_revision_delta(text, trace, revision, snapshot, reused=()):
+    if snapshot is None:
+        return text
+    trace.set(overall=snapshot["overall"], scores=snapshot["scores"])
+    if revision is None:
+        return text
+    previous = revisions.record_revision(result_cache, revision, snapshot)
+    if previous is None:
+        return text
+    return revisions.format_revision_delta(previous, snapshot, reused) + "\n\n" + text
+
+# Función para guardar la instantánea de un análisis nuevo (secciones y puntajes) y mostrar los cambios
+def finish_analysis(text, trace, revision, cache_key, resume_text, local_reports, llm_scores, reused=()):
+    scores = {name: report.score for name, report in local_reports.items()}
+    scores.update(llm_scores)
+    snapshot = revisions.make_snapshot(cache_key, resume_text, scores)
+    revisions.save_snapshot(result_cache, snapshot)
+    return with_revision_delta(text, trace, revision, snapshot, reused)
+
+# Clave de la caché de una categoría: sólo depende de su prompt (las secciones del CV que evalúa)
+def category_cache_key(category, prompt):
+    return make_cache_key(prompt, "", f"category:{category.key}", GEMINI_MODEL, PROMPT_VERSION)
+
+# Identificador del texto de un CV (en el historial y en el índice de duplicados)
+def resume_hash(resume_text):
+    return hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+
+# Clave de la caché que apunta al informe de un CV ya analizado con una oferta y un modo
+def duplicate_cache_key(resume_digest, job_description, mode):
+    return make_cache_key(f"duplicate:{resume_digest}", job_description, mode, GEMINI_MODEL, PROMPT_VERSION)
+
+# Función para buscar un CV casi idéntico ya analizado con la misma oferta y modo cuyo informe siga en la caché.
+# Devuelve ese informe precedido de un aviso, o None si no hay ninguno (o signature es None).
+def reuse_near_duplicate(signature, job_description, mode, trace):
+    if signature is None:
+        return None
+    with trace.stage("duplicate_lookup"):
+        for match in duplicate_index.query(signature):
+            original_key = result_cache.get(duplicate_cache_key(match.doc_id, job_description, mode))
+            cached = result_cache.get(original_key) if original_key else None
+            if cached is not None:
+                break
+        else:
+            return None
+    metrics.increment("ats_duplicate_reuse_total", mode=mode)
+    trace.set(duplicate_of=match.doc_id, similarity=round(match.similarity, 3))
+    snapshot = revisions.load_snapshot(result_cache, original_key)
+    return format_duplicate_note(match.similarity) + "\n\n" + with_revision_delta(cached, trace, None, snapshot)
+
+# Función para registrar un CV recién analizado: su firma en el índice y la referencia a su informe
+def register_duplicate(signature, resume_text, job_description, mode, cache_key):
+    if signature is None:
+        return
+    digest = resume_hash(resume_text)
+    duplicate_index.add(digest, signature)
+    result_cache.put(duplicate_cache_key(digest, job_description, mode), cache_key)
+
+# Función para pedir una categoría de la rúbrica con respuesta JSON (sin streaming: la respuesta es corta).
+# Pasa por el planificador como cualquier otra llamada: cuota, reintentos y coalescencia.
+def request_category(gemini_model, category, prompt, api_key, flight_key, trace=metrics.NULL_TRACE):
+    started = time.perf_counter()
+    
+    def call(timeout):
+        response = gemini_model.generate_content(prompt, generation_config=JSON_GENERATION_CONFIG, request_options={"timeout": timeout})
+        log_token_usage(response, trace)
+        yield response.text
+    
+    estimated_tokens = estimate_tokens(category.system_instruction, prompt) + CATEGORY_OUTPUT_TOKEN_ESTIMATE
+    text = "".join(request_scheduler.stream(api_key, f"{flight_key}:{category.key}", call, estimated_tokens, trace))
+    trace.record_stage(f"gemini_{category.key}", time.perf_counter() - started)
+    result = parse_category_response(text)
+    if not result:
+        raise ValueError("Gemini no devolvió un JSON válido")
+    return result
+
+# Función para analizar la rúbrica en paralelo: una petición por categoría, todas a la vez, y la preparación
+# para la entrevista sólo si la adecuación es >= 7. La latencia se acerca a la de la categoría más lenta.
+# Cada categoría recibe sólo las secciones del CV que evalúa y su resultado se guarda en la caché por separado:
+# al volver a subir el CV con cambios en unas secciones, las categorías que no las leen no se vuelven a pedir.
+# Devuelve (informe, puntajes de Gemini, categorías reutilizadas) si el informe está completo.
+def analyze_in_parallel(prompt, local_reports, api_key, cache_key, progress=no_progress, trace=metrics.NULL_TRACE,
+                        resume_text=None, job_description=""):
+    progress(0.1, desc="Iniciando análisis en paralelo...")
+    categories = RUBRIC_CATEGORIES + (EVALUATION_CATEGORY,)
+    sections = split_resume_sections(resume_text) if resume_text is not None else []
+    prompts = {}
+    for category in categories:
+        facts = format_local_facts({name: local_reports[name] for name in category.local_reports if name in local_reports})
+        prompts[category.key] = (
+            build_category_prompt(category, sections, job_description, facts, prompt) if resume_text is not None else prompt
+        )
+    
+    results = {}
+    errors = {}
+    reused = []
+    with trace.stage("category_cache_lookup"):
+        for category in categories:
+            cached = result_cache.get(category_cache_key(category, prompts[category.key]))
+            if cached is not None:
+                results[category.key] = json.loads(cached)
+                reused.append(category.title)
+    metrics.increment("ats_cache_requests_total", len(reused), result="category_hit")
+    pending = [category for category in categories if category.key not in results]
+    trace.set(reused_categories=len(reused))
+    
+    with trace.stage("configure_gemini"):
+        models = {}
+        for category in pending + [INTERVIEW_CATEGORY]:
+            models[category.key] = configure_gemini(api_key, category.system_instruction)
+            if isinstance(models[category.key], str):  # Es un mensaje de error
+                yield models[category.key]
+                return None
+    
+    # Pide una categoría y guarda su resultado para las siguientes versiones del CV
+    def request_and_store(category, category_prompt):
+        result = request_category(models[category.key], category, category_prompt, api_key, cache_key, trace)
+        result_cache.put(category_cache_key(category, category_prompt), json.dumps(result, ensure_ascii=False))
+        return result
+    
+    executor = _fanout()
+    with trace.stage("gemini_generate"):
+        if reused:
+            yield format_parallel_report(local_reports, results, errors)
+        futures = {executor.submit(request_and_store, category, prompts[category.key]): category for category in pending}
+        try:
+            for future in as_completed(futures):
+                category = futures[future]
+                try:
+                    results[category.key] = future.result()
+                except Exception as e:
+                    errors[category.key] = f"Error al consultar Gemini API: {e}"
+                progress(0.1 + 0.75 * (len(results) + len(errors)) / len(categories), desc=f"Completado: {category.title}")
+                yield format_parallel_report(local_reports, results, errors)
+        finally:
+            # Si el usuario abandona la petición, las categorías que aún no han empezado no se envían
+            for future in futures:
+                future.cancel()
+        
+        if len(errors) == len(categories):
+            trace.set(parallel=True, failed_categories=sorted(errors))
+            yield ErrorMessage(errors[EVALUATION_CATEGORY.key])
+            return None
+        
+        fit = fit_score(results.get(EVALUATION_CATEGORY.key))
+        if fit is not None and fit >= INTERVIEW_MIN_FIT:
+            progress(0.9, desc=f"Generando: {INTERVIEW_CATEGORY.title}")
+            interview_prompt = build_interview_prompt(prompt, results[EVALUATION_CATEGORY.key])
+            cached = result_cache.get(category_cache_key(INTERVIEW_CATEGORY, interview_prompt))
+            try:
+                if cached is not None:
+                    results[INTERVIEW_CATEGORY.key] = json.loads(cached)
+                    reused.append(INTERVIEW_CATEGORY.title)
+                else:
+                    results[INTERVIEW_CATEGORY.key] = request_and_store(INTERVIEW_CATEGORY, interview_prompt)
+            except Exception as e:
+                errors[INTERVIEW_CATEGORY.key] = f"Error al consultar Gemini API: {e}"
+    
+    trace.set(parallel=True, failed_categories=sorted(errors))
+    text = format_parallel_report(local_reports, results, errors)
+    # Un informe incompleto no se guarda: la próxima vez se vuelven a pedir las categorías que fallaron
+    if errors:
+        yield text
+        return None
+    with trace.stage("cache_store"):
+        result_cache.put(cache_key, text)
+    progress(1.0, desc="Análisis completado")
+    
+    llm_scores = {}
+    for category in RUBRIC_CATEGORIES:
+        llm_scores.update(category_scores(category, results[category.key]))
+    return text, llm_scores, reused
+
+# Función para calcular la puntuación del currículum y las sugerencias mediante Google Gemini
+def get_suggestions_from_gemini(document, api_key, progress=no_progress, trace=metrics.NULL_TRACE, session_id=None, reuse_duplicates=False,
+                                local_reports=None):
+    if document is None:
+        yield ErrorMessage("Por favor, cargue un currículum válido primero.")
+        return
+    
+    if not api_key:
+        yield ErrorMessage("Por favor, proporcione una clave API de Gemini válida.")
+        return
+    
+    resume_text = document.text
+    revision = revisions.revision_key(resume_text, session_id, "", "ats_general")
+    
+    # Un mismo CV ya analizado no vuelve a consumir cuota de la API
+    cache_key = make_cache_key(resume_text, "", "ats_general", GEMINI_MODEL, PROMPT_VERSION)
+    with trace.stage("cache_lookup"):
+        cached = result_cache.get(cache_key)
+    metrics.increment("ats_cache_requests_total", result="miss" if cached is None else "hit")
+    trace.set(cache_hit=cached is not None)
+    if cached is not None:
+        progress(1.0, desc="Resultado recuperado de la caché")
+        yield with_revision_delta(cached, trace, revision, revisions.load_snapshot(result_cache, cache_key))
+        return
+    
+    # En lote, un CV casi idéntico a otro ya analizado reutiliza su informe
+    signature = minhash_signature(resume_text) if reuse_duplicates else None
+    reused_report = reuse_near_duplicate(signature, "", "ats_general", trace)
+    if reused_report is not None:
+        progress(1.0, desc="Informe reutilizado de un CV casi idéntico")
+        yield reused_report
+        return
+    
+    with trace.stage("prompt_build"):
+        # Información adicional que podemos incluir gracias a PyMuPDF
+        additional_info = describe_document(document)
+        
+        # Informes mecánicos calculados localmente (si no llegan ya calculados): entran en el prompt como hechos
+        local_reports = local_reports if local_reports is not None else score_document(document)
+        local_facts = format_local_facts(local_reports)
+        
+        cleaned_text = clean_resume_text(document.pages)
+        prompt = build_ats_general_prompt(cleaned_text, additional_info, local_facts)
+    
+    progress(0.1, desc="Iniciando análisis ATS avanzado...")
+    
+    with trace.stage("configure_gemini"):
+        gemini_model = configure_gemini(api_key, ATS_GENERAL_SYSTEM_INSTRUCTION)
+    if isinstance(gemini_model, str):  # Es un mensaje de error
+        yield gemini_model
+        return
+    
+    text = ""
+    try:
+        estimated_tokens = estimate_tokens(ATS_GENERAL_SYSTEM_INSTRUCTION, prompt)
+        trace.set(estimated_prompt_tokens=estimated_tokens)
+        with trace.stage("gemini_generate"):
+            for text in stream_gemini(gemini_model, prompt, ATS_GENERAL_SECTIONS, progress, api_key, cache_key, estimated_tokens, trace):
+                yield text
+    except Exception as e:
+        yield ErrorMessage(f"Error al consultar Gemini API: {e}")
+        return
+    
+    # La puntuación general ponderada se calcula aquí con los puntajes locales y los de Gemini
+    with trace.stage("postprocess"):
+        llm_scores, report = parse_llm_scores(text)
+        text = format_overall_section(local_reports, llm_scores) + "\n\n" + report
+    yield finish_analysis(text, trace, revision, cache_key, cleaned_text, local_reports, llm_scores)
+    with trace.stage("cache_store"):
+        result_cache.put(cache_key, text)
+    register_duplicate(signature, resume_text, "", "ats_general", cache_key)
+    progress(1.0, desc="Análisis completado")
+
+# Función principal para procesar el PDF
+def process_pdf(file):
+    if file is None:
+        return ErrorMessage("Por favor, cargue un archivo PDF."), None
+    
+    # Una sola pasada sobre el PDF (texto, métricas, metadatos y diseño) en un proceso aparte
+    try:
+        document = pdf_parser.parse(file)
+    except Exception as e:
+        return ErrorMessage(f"Error al leer PDF: {e}"), None
+    
+    return "Currículum cargado y procesado correctamente. Continúe con la acción seleccionada.", document
+
+# Función para preparar el resaltado de errores de un CV ya analizado (outcome de process_based_on_option):
+# hallazgos locales y citas del informe. Devuelve None si el análisis no terminó bien (errores, campos vacíos).
+def prepare_highlights(outcome, report_text):
+    if not outcome or outcome.get("status") not in ("ok", "parcial") or outcome.get("document") is None:
+        return None
+    document = outcome["document"]
+    highlights = collect_highlights(document, outcome["local_reports"], report_text)
+    return HighlightedDocument(outcome["data"], len(document.pages), highlights)
+
+# Función para obtener una página resaltada (PNG y hallazgos por tipo): se renderiza sólo cuando se muestra,
+# en los procesos de análisis de PDF, y queda en la caché para las siguientes visitas
+def render_highlighted_page(highlighted, page_number, dpi=HIGHLIGHT_DPI):
+    key = (highlighted.doc_hash, page_number, dpi)
+    cached = page_images.get(key)
+    if cached is None:
+        started = time.perf_counter()
+        cached = pdf_parser.render(highlighted.data, page_number, dpi, highlighted.highlights)
+        metrics.observe("ats_stage_seconds", time.perf_counter() - started, stage="highlight_render")
+        page_images.put(key, cached)
+    return cached
+
+# Modo de análisis de cada opción de la interfaz (etiqueta de las métricas y del historial)
+OPTION_MODES = {
+    "Analizar con descripción de puesto": "job_description",
+    "Análisis general ATS": "ats_general",
+}
+
+# Estado de un análisis terminado: "error" si no hay informe, "parcial" si fallaron categorías del análisis
+# en paralelo (se muestra el informe, pero incompleto y sin guardar en la caché) y "ok" en otro caso
+def analysis_status(report, trace):
+    if isinstance(report, ErrorMessage):
+        return "error"
+    if getattr(trace, "attributes", {}).get("failed_categories"):
+        return "parcial"
+    return "ok"
+
+# Función para encolar un análisis terminado en el historial (puntajes y tiempos salen de la traza).
+# Sólo encola: la escritura en SQLite la hace el hilo del historial, fuera de la petición.
+def record_history(document, job_description, mode, report, trace, source=None):
+    if not history_store.enabled:
+        return
+    attributes = getattr(trace, "attributes", {})
+    history_store.record({
+        "created_at": time.time(),
+        "candidate": revisions.contact_identity(document.text),
+        "source": source,
+        "resume_hash": resume_hash(document.text),
+        "job_hash": history.job_hash(job_description),
+        "job_title": history.job_title(job_description),
+        "mode": mode,
+        "status": analysis_status(report, trace),
+        "overall": attributes.get("overall"),
+        "scores": attributes.get("scores"),
+        "seconds": round(time.perf_counter() - trace.started, 3),
+        "timings": {name: round(value, 4) for name, value in dict(trace.stages).items()},
+        "report": report,
+    })
+
+# Nombre del archivo subido para el historial (Gradio entrega una ruta o un objeto con .name)
+def source_name(file):
+    name = getattr(file, "name", file)
+    return os.path.basename(name) if isinstance(name, str) else None
+
+# Función para procesar según la opción seleccionada, midiendo cada etapa si la instrumentación está activa.
+# Con el historial activo la traza se crea siempre: de ella salen los tiempos que se guardan.
+# Si se pasa outcome (un diccionario), al terminar recibe el PDF leído, su ResumeDocument, los informes locales
+# y el estado, para que la interfaz prepare el resaltado de errores sin volver a leer ni analizar el PDF.
+def process_based_on_option(option, file, job_description, api_key, progress=no_progress, parallel=None, session_id=None,
+                            outcome=None):
+    trace = metrics.start_trace(OPTION_MODES.get(option, "desconocido"), force=history_store.enabled)
+    outcome = {} if outcome is None else outcome
+    status = "cancelado"
+    text = ""
+    try:
+        for text in _process_option(option, file, job_description, api_key, progress, trace, parallel, session_id, outcome):
+            yield text
+        status = analysis_status(text, trace)
+    finally:
+        outcome["status"] = status
+        trace.finish(status)
+
+def _process_option(option, file, job_description, api_key, progress, trace, parallel, session_id, outcome):
+    progress(0.0, desc="Leyendo el currículum...")
+    with trace.stage("pdf_parse"):
+        try:
+            data = read_pdf_bytes(file, pdf_parser.max_bytes) if file is not None else None
+            status, document = process_pdf(data)
+        except Exception as e:
+            status, document = ErrorMessage(f"Error al leer PDF: {e}"), None
+    
+    if document is None:
+        yield status
+        return
+    
+    trace.set(pdf_pages=document.page_count, pdf_bytes=document.file_size)
+    metrics.observe("ats_pdf_pages", document.page_count)
+    metrics.observe("ats_pdf_bytes", document.file_size)
+    
+    if not api_key:
+        yield ErrorMessage("Por favor, proporcione una clave API de Gemini válida.")
+        return
+    
+    local_reports = score_document(document)
+    outcome.update(data=data, document=document, local_reports=local_reports)
+    if option == "Analizar con descripción de puesto":
+        if not job_description:
+            yield ErrorMessage("Por favor, proporcione una descripción del puesto.")
+            return
+        stream = analyze_resume(job_description, document, api_key, progress, trace, parallel, session_id,
+                                local_reports=local_reports)
+    elif option == "Análisis general ATS":
+        job_description = ""
+        stream = get_suggestions_from_gemini(document, api_key, progress, trace, session_id, local_reports=local_reports)
+    else:
+        yield ErrorMessage("Por favor, seleccione una opción válida.")
+        return
+    
+    text = ""
+    for text in stream:
+        yield text
+    record_history(document, job_description, OPTION_MODES[option], text, trace, source_name(file))
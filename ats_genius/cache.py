@@ -0,0 +1,121 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Ruta y límites por defecto de la caché de resultados (configurables por variables de entorno)
+DEFAULT_CACHE_PATH = os.environ.get(
+    "ATS_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "ats-genius", "results.sqlite3"),
+)
+DEFAULT_MAX_ENTRIES = int(os.environ.get("ATS_CACHE_MAX_ENTRIES", 5000))
+DEFAULT_MAX_BYTES = int(os.environ.get("ATS_CACHE_MAX_MB", 200)) * 1024 * 1024
+DEFAULT_TTL_SECONDS = int(os.environ.get("ATS_CACHE_TTL_DAYS", 30)) * 24 * 3600
+
+# Función para normalizar la descripción del puesto: espacios y mayúsculas no deben invalidar la caché
+def normalize_job_description(job_description):
+    return " ".join((job_description or "").split()).lower()
+
+# Función para construir la clave de la caché a partir de todo lo que determina el resultado
+def make_cache_key(resume_text, job_description, mode, model_name, prompt_version):
+    digest = hashlib.sha256()
+    for part in (resume_text, normalize_job_description(job_description), mode, model_name, prompt_version):
+        data = (part or "").encode("utf-8")
+        # Prefijo de longitud para que las partes no se puedan confundir entre sí
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+# Caché persistente en SQLite de los análisis de Gemini, direccionada por contenido, con expulsión LRU/TTL
+class ResultCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+
+    # Abre la conexión de forma perezosa; se comparte entre los hilos de Gradio protegida por el lock
+    def _connection(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+            self._conn = conn
+        return self._conn
+
+    # Devuelve el resultado guardado o None si no existe, ha caducado o la caché no está disponible
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+                return value
+        except sqlite3.Error:
+            return None
+
+    # Guarda un resultado y aplica los límites de tamaño y antigüedad
+    def put(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now),
+                )
+                self._evict(conn, now)
+        except sqlite3.Error:
+            pass
+
+    # Elimina las entradas caducadas y, si se superan los límites, las menos usadas recientemente
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_access ASC").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def clear(self):
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM results")
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
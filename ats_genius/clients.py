@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+
+# Tiempo sin uso tras el cual se cierran los clientes de una clave API
+DEFAULT_IDLE_SECONDS = 15 * 60
+
+# Función para crear el cliente de la API de Gemini de una clave concreta, sin pasar por genai.configure.
+# Las librerías de Google se importan al crear el primer cliente, no al importar el módulo.
+def create_client(api_key):
+    import google.ai.generativelanguage as glm
+    from google.api_core import client_options as client_options_lib
+
+    return glm.GenerativeServiceClient(client_options=client_options_lib.ClientOptions(api_key=api_key))
+
+# Función para crear un modelo ligado al cliente de su clave
+def create_model(client, model_name, system_instruction):
+    import google.generativeai as genai
+
+    model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+    # GenerativeModel no acepta un cliente como parámetro y, si no tiene uno, usa el global de genai.configure
+    model._client = client
+    return model
+
+# Entrada del pool: el cliente de una clave y los modelos construidos sobre él
+class _PoolEntry:
+    __slots__ = ("client", "models", "last_used")
+
+    def __init__(self, client):
+        self.client = client
+        self.models = {}
+        self.last_used = time.monotonic()
+
+# Pool de clientes y modelos de Gemini por clave API, seguro entre los hilos de la cola de Gradio
+class GeminiClientPool:
+    def __init__(self, idle_seconds=DEFAULT_IDLE_SECONDS, client_factory=create_client, model_factory=create_model):
+        self.idle_seconds = idle_seconds
+        self.client_factory = client_factory
+        self.model_factory = model_factory
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    # Las claves no se guardan en claro como índice del pool
+    @staticmethod
+    def _key_id(api_key):
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    # Devuelve el modelo para la clave, reutilizando el cliente (y sus conexiones) si ya existe
+    def get_model(self, api_key, model_name, system_instruction=None):
+        now = time.monotonic()
+        key_id = self._key_id(api_key)
+        with self._lock:
+            expired = self._evict_idle(now)
+            entry = self._entries.get(key_id)
+            if entry is None:
+                entry = self._entries[key_id] = _PoolEntry(self.client_factory(api_key))
+            entry.last_used = now
+
+            model_key = (model_name, system_instruction)
+            model = entry.models.get(model_key)
+            if model is None:
+                model = entry.models[model_key] = self.model_factory(entry.client, model_name, system_instruction)
+
+        # Los clientes caducados se cierran fuera del lock
+        for client in expired:
+            self._close_client(client)
+        return model
+
+    # Retira del pool las claves sin uso durante más de idle_seconds
+    def _evict_idle(self, now):
+        expired_ids = [key_id for key_id, entry in self._entries.items() if now - entry.last_used > self.idle_seconds]
+        return [self._entries.pop(key_id).client for key_id in expired_ids]
+
+    @staticmethod
+    def _close_client(client):
+        transport = getattr(client, "transport", None)
+        if transport is not None:
+            try:
+                transport.close()
+            except Exception:
+                pass
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def close(self):
+        with self._lock:
+            clients = [entry.client for entry in self._entries.values()]
+            self._entries.clear()
+        for client in clients:
+            self._close_client(client)
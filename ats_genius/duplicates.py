@@ -0,0 +1,208 @@
+import logging
+import os
+import re
+import threading
+import zlib
+from array import array
+
+import numpy as np
+
+from .ranking import normalize_text
+
+logger = logging.getLogger("ats_genius")
+
+# Similitud de Jaccard estimada a partir de la cual dos CV se consideran casi idénticos, y ruta del índice
+DUPLICATE_THRESHOLD = float(os.environ.get("ATS_DUPLICATE_THRESHOLD", 0.85))
+DEFAULT_INDEX_PATH = os.environ.get(
+    "ATS_DUPLICATES_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "ats-genius", "duplicates.npz"),
+)
+
+# Firmas MinHash de 128 permutaciones divididas en 16 bandas de 8 filas para el índice LSH: dos CV con
+# similitud 0,85 comparten alguna banda con un 99 % de probabilidad; con similitud 0,5, menos de un 7 %
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Shingles de 4 palabras: cambiar una palabra sólo altera los 4 shingles que la contienen
+SHINGLE_SIZE = 4
+WORD_RE = re.compile(r"\w+")
+
+# Altas recientes que se buscan por fuerza bruta antes de fusionarlas en las bandas ordenadas
+MERGE_SIZE = 4096
+
+# Permutaciones h(x) = (a·x + b) mod p con p primo mayor que 2^32: a·x + b cabe en 64 bits sin desbordar.
+# La semilla es fija para que las firmas guardadas en disco sigan siendo comparables entre ejecuciones.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240611)
+_PERM_A = _rng.integers(1, 2 ** 32, NUM_PERM, dtype=np.uint64)[:, None]
+_PERM_B = _rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint64)[:, None]
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_BAND_MIX = _rng.integers(1, 2 ** 63, ROWS, dtype=np.uint64)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Función para calcular la firma MinHash de un texto extraído (None si no tiene palabras suficientes).
+# Se normaliza como en el ranking, así que acentos, mayúsculas, espacios y saltos de página no cuentan.
+def minhash_signature(text):
+    words = WORD_RE.findall(normalize_text(text))
+    if len(words) < SHINGLE_SIZE:
+        return None
+    tokens = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+    # Hash de cada shingle combinando los de sus palabras (aritmética módulo 2^64) y plegado a 32 bits
+    shingles = tokens[:len(tokens) - SHINGLE_SIZE + 1].copy()
+    with np.errstate(over="ignore"):
+        for offset in range(1, SHINGLE_SIZE):
+            shingles = shingles * _MIX + tokens[offset:len(tokens) - SHINGLE_SIZE + 1 + offset]
+    shingles = np.unique((shingles >> np.uint64(32)) ^ (shingles & _MAX_HASH))
+    return (((_PERM_A * shingles + _PERM_B) % _PRIME) & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+# Claves LSH de una firma: un hash de 32 bits por banda
+def band_keys(signature):
+    rows = signature.astype(np.uint64).reshape(BANDS, ROWS)
+    with np.errstate(over="ignore"):
+        keys = (rows * _BAND_MIX).sum(axis=1, dtype=np.uint64)
+    return ((keys >> np.uint64(32)) ^ (keys & _MAX_HASH)).astype(np.uint32)
+
+# CV casi idéntico encontrado en el índice: su identificador y la similitud estimada
+class DuplicateMatch:
+    __slots__ = ("doc_id", "similarity")
+
+    def __init__(self, doc_id, similarity):
+        self.doc_id = doc_id
+        self.similarity = similarity
+
+# Índice LSH de firmas MinHash para encontrar CV casi idénticos sin compararlos con todo el corpus.
+# De cada CV sólo se guardan en arrays 16 bits de cada valor de la firma (256 bytes) y sus 16 claves de
+# banda con su posición (128 bytes): 300.000 CV ocupan unos 150 MB con sus identificadores. Cada banda es
+# un array ordenado en el que se busca por bisección; las altas recientes se comparan por fuerza bruta
+# hasta que se fusionan en bloque.
+class DuplicateIndex:
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.doc_ids = []
+        self._positions = {}
+        self._signatures = array("H")
+        self._recent_keys = array("I")
+        self._merged = 0
+        self._band_keys = [np.empty(0, dtype=np.uint32) for _ in range(BANDS)]
+        self._band_positions = [np.empty(0, dtype=np.uint32) for _ in range(BANDS)]
+        # Las vistas NumPy sobre los arrays impiden redimensionarlos: añadir y consultar no se solapan
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._positions
+
+    # Añade la firma de un CV; volver a añadir el mismo id no hace nada
+    def add(self, doc_id, signature):
+        if signature is None:
+            return None
+        keys = band_keys(signature)
+        with self._lock:
+            if doc_id in self._positions:
+                return self._positions[doc_id]
+            position = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self._positions[doc_id] = position
+            self._signatures.frombytes(signature.astype(np.uint16).tobytes())
+            self._recent_keys.frombytes(keys.tobytes())
+            if position + 1 - self._merged >= MERGE_SIZE:
+                self._merge()
+            return position
+
+    # Fusiona las altas recientes en las bandas ordenadas (inserción en bloque, sin reordenar todo)
+    def _merge(self):
+        count = len(self.doc_ids) - self._merged
+        if not count:
+            return
+        recent = np.frombuffer(self._recent_keys, dtype=np.uint32).reshape(count, BANDS)
+        positions = np.arange(self._merged, self._merged + count, dtype=np.uint32)
+        for band in range(BANDS):
+            order = np.argsort(recent[:, band], kind="stable")
+            keys = recent[order, band]
+            slots = np.searchsorted(self._band_keys[band], keys, side="right")
+            self._band_keys[band] = np.insert(self._band_keys[band], slots, keys)
+            self._band_positions[band] = np.insert(self._band_positions[band], slots, positions[order])
+        self._recent_keys = array("I")
+        self._merged += count
+
+    # Devuelve los CV del índice con similitud estimada >= threshold, del más parecido al menos
+    def query(self, signature, threshold=None, exclude=None):
+        if signature is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        keys = band_keys(signature)
+        with self._lock:
+            return self._query(signature, keys, threshold, exclude)
+
+    def _query(self, signature, keys, threshold, exclude):
+        candidates = []
+        for band in range(BANDS):
+            band_keys_sorted = self._band_keys[band]
+            start = np.searchsorted(band_keys_sorted, keys[band], side="left")
+            end = np.searchsorted(band_keys_sorted, keys[band], side="right")
+            candidates.append(self._band_positions[band][start:end])
+        if len(self._recent_keys):
+            recent = np.frombuffer(self._recent_keys, dtype=np.uint32).reshape(-1, BANDS)
+            candidates.append(np.flatnonzero((recent == keys).any(axis=1)).astype(np.uint32) + self._merged)
+        candidates = np.unique(np.concatenate(candidates))
+        if not len(candidates):
+            return []
+
+        # Similitud estimada: proporción de valores de la firma que coinciden
+        signatures = np.frombuffer(self._signatures, dtype=np.uint16).reshape(-1, NUM_PERM)
+        similarities = (signatures[candidates] == signature.astype(np.uint16)).mean(axis=1)
+        order = np.argsort(-similarities, kind="stable")
+        matches = []
+        for index in order:
+            if similarities[index] < threshold:
+                break
+            doc_id = self.doc_ids[candidates[index]]
+            if doc_id != exclude:
+                matches.append(DuplicateMatch(doc_id, float(similarities[index])))
+        return matches
+
+    # Guarda el índice en un .npz (escritura atómica: nunca queda un archivo a medias)
+    def save(self, path=DEFAULT_INDEX_PATH):
+        with self._lock:
+            count = len(self.doc_ids)
+            signatures = np.frombuffer(self._signatures, dtype=np.uint16).reshape(count, NUM_PERM).copy()
+            keys = np.empty((count, BANDS), dtype=np.uint32)
+            for band in range(BANDS):
+                keys[self._band_positions[band], band] = self._band_keys[band]
+            if count > self._merged:
+                keys[self._merged:] = np.frombuffer(self._recent_keys, dtype=np.uint32).reshape(-1, BANDS)
+            doc_ids = np.array([str(doc_id) for doc_id in self.doc_ids], dtype=np.str_)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as fh:
+            np.savez(fh, doc_ids=doc_ids, signatures=signatures, keys=keys)
+        os.replace(temporary, path)
+
+    # Carga un índice guardado; si no existe o está dañado, se empieza con uno vacío
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH, threshold=DUPLICATE_THRESHOLD):
+        index = cls(threshold)
+        if not os.path.exists(path):
+            return index
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                doc_ids, signatures, keys = data["doc_ids"], data["signatures"], data["keys"]
+            if signatures.shape != (len(doc_ids), NUM_PERM) or keys.shape != (len(doc_ids), BANDS):
+                raise ValueError("dimensiones incorrectas")
+        except Exception as e:
+            logger.warning("No se pudo cargar el índice de duplicados %s: %s", path, e)
+            return index
+        index.doc_ids = doc_ids.tolist()
+        index._positions = {doc_id: position for position, doc_id in enumerate(index.doc_ids)}
+        index._signatures.frombytes(signatures.astype(np.uint16).tobytes())
+        index._recent_keys.frombytes(keys.astype(np.uint32).tobytes())
+        index._merge()
+        return index
+
+# Función para avisar de que el informe es el de un CV casi idéntico analizado antes
+def format_duplicate_note(similarity):
+    return (f"> ♻️ Este CV es casi idéntico (similitud del {similarity:.0%}) a otro ya analizado: "
+            "se reutiliza su informe sin volver a llamar a Gemini.")
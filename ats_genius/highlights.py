@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from .scoring import find_unquantified_bullets
+
+# Resolución de las páginas resaltadas y memoria máxima de la caché de imágenes (configurables)
+HIGHLIGHT_DPI = int(os.environ.get("ATS_HIGHLIGHT_DPI", 110))
+IMAGE_CACHE_BYTES = int(os.environ.get("ATS_HIGHLIGHT_CACHE_MB", 64)) * 1024 * 1024
+
+# Tipos de hallazgo que se resaltan: etiqueta de la leyenda y color (RGB de 0 a 1)
+HIGHLIGHT_KINDS = {
+    "typo": ("🟥 Ortografía y gramática", (0.96, 0.26, 0.21)),
+    "passive": ("🟧 Voz pasiva", (1.0, 0.6, 0.0)),
+    "unquantified": ("🟨 Bullet sin cuantificar", (1.0, 0.92, 0.23)),
+    "buzzword": ("🟪 Buzzword", (0.61, 0.35, 0.71)),
+    "gemini": ("🟦 Otros hallazgos de Gemini", (0.13, 0.59, 0.95)),
+}
+
+# Fragmentos que Gemini cita entre comillas en el informe, y líneas que hablan de ortografía o gramática
+QUOTE_RE = re.compile(r"«([^«»\n]{3,160})»|“([^“”\n]{3,160})”|\"([^\"\n]{3,160})\"")
+SPELLING_HINT_RE = re.compile(r"ortogr|gramat|gramát|tipogr|errata|acent|puntuaci|spelling|typo|grammar", re.IGNORECASE)
+MAX_NEEDLE_CHARS = 120
+
+# Función para reunir los fragmentos del CV que hay que resaltar: hallazgos locales (voz pasiva, buzzwords,
+# bullets sin cuantificar) y los textos que Gemini cita en el informe. Sólo se guardan los que aparecen
+# de verdad en el CV, así no se buscan en el PDF los ejemplos de la rúbrica ni citas inventadas.
+def collect_highlights(document, local_reports, report_text):
+    resume_text = " ".join(document.text.split()).lower()
+    highlights = []
+    seen = set()
+
+    def add(kind, fragment):
+        fragment = " ".join(fragment.split())[:MAX_NEEDLE_CHARS].strip(" .,;:")
+        key = fragment.lower()
+        if len(fragment) >= 3 and key not in seen and key in resume_text:
+            seen.add(key)
+            highlights.append((kind, fragment))
+
+    # Cada fragmento se resalta una sola vez; los errores ortográficos tienen prioridad y las demás citas
+    # de Gemini son las últimas (suelen repetir un hallazgo local con otras palabras)
+    quotes = []
+    for line in (report_text or "").splitlines():
+        kind = "typo" if SPELLING_HINT_RE.search(line) else "gemini"
+        quotes += [(kind, next(group for group in match.groups() if group)) for match in QUOTE_RE.finditer(line)]
+    for kind, fragment in quotes:
+        if kind == "typo":
+            add(kind, fragment)
+    for fragment in getattr(local_reports.get("PassiveVoiceReport"), "findings", ()):
+        add("passive", fragment)
+    for fragment in getattr(local_reports.get("BuzzwordsReport"), "findings", ()):
+        add("buzzword", fragment)
+    for bullet in find_unquantified_bullets(document.text):
+        add("unquantified", bullet)
+    for kind, fragment in quotes:
+        if kind == "gemini":
+            add(kind, fragment)
+    return highlights
+
+# Función para renderizar una página con todos sus hallazgos resaltados. Se ejecuta en los procesos de
+# análisis de PDF: una TextPage para todas las búsquedas y una anotación por tipo con todas sus apariciones.
+def render_page(data, page_number, dpi, highlights):
+    import pymupdf as fitz
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page = doc[page_number]
+        textpage = page.get_textpage()
+        quads = {}
+        counts = {}
+        for kind, fragment in highlights:
+            found = page.search_for(fragment, quads=True, textpage=textpage)
+            if found:
+                quads.setdefault(kind, []).extend(found)
+                counts[kind] = counts.get(kind, 0) + 1
+        for kind, kind_quads in quads.items():
+            annot = page.add_highlight_annot(kind_quads)
+            annot.set_colors(stroke=HIGHLIGHT_KINDS[kind][1])
+            annot.set_opacity(0.45)
+            annot.update()
+        pixmap = page.get_pixmap(dpi=dpi, annots=True)
+        return pixmap.tobytes("png"), counts
+
+# CV preparado para mostrar sus errores: bytes del PDF, páginas que se pueden mostrar y fragmentos a resaltar.
+# El hash identifica el documento anotado (PDF y resaltados): es la clave de sus imágenes en la caché.
+class HighlightedDocument:
+    __slots__ = ("data", "page_count", "highlights", "doc_hash")
+
+    def __init__(self, data, page_count, highlights):
+        self.data = data
+        self.page_count = page_count
+        self.highlights = tuple(highlights)
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(self.highlights, ensure_ascii=False).encode("utf-8"))
+        self.doc_hash = digest.hexdigest()
+
+# Caché LRU de las páginas ya renderizadas (PNG y hallazgos por tipo), limitada por memoria y compartida
+# por todas las sesiones. La clave es (hash del documento, página, DPI).
+class PageImageCache:
+    def __init__(self, max_bytes=IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = len(value[0])
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+# Función para presentar la leyenda de una página: cuántos fragmentos de cada tipo se han resaltado
+def format_legend(counts, page_number, page_count):
+    lines = [f"**Página {page_number + 1} de {page_count}**"]
+    found = [f"{HIGHLIGHT_KINDS[kind][0]}: {counts[kind]}" for kind in HIGHLIGHT_KINDS if counts.get(kind)]
+    lines.append(" · ".join(found) if found else "Sin errores resaltados en esta página.")
+    return "\n\n".join(lines)
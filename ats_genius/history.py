@@ -0,0 +1,336 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from .cache import normalize_job_description
+
+logger = logging.getLogger("ats_genius")
+
+# Ruta del historial de análisis (configurable por variables de entorno; ATS_HISTORY=0 lo desactiva)
+DEFAULT_HISTORY_PATH = os.environ.get(
+    "ATS_HISTORY_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "ats-genius", "history.sqlite3"),
+)
+ENABLED = os.environ.get("ATS_HISTORY", "1").lower() not in ("0", "false", "no", "off")
+
+# Análisis pendientes de escribir como máximo (si se llena, se descartan en lugar de bloquear la petición)
+QUEUE_SIZE = 10000
+# Análisis que se escriben en una misma transacción
+WRITE_BATCH = 500
+PAGE_SIZE = 25
+
+# Orden del listado: columna y sentido. El id crece con la fecha, así que ordenar por fecha es ordenar por id,
+# y cada índice de SQLite incluye el rowid: todas las páginas se leen por índice, sin ordenar en memoria.
+SORT_ORDERS = {
+    "Más recientes": ("id", "DESC"),
+    "Más antiguos": ("id", "ASC"),
+    "Mayor puntuación": ("overall", "DESC"),
+    "Menor puntuación": ("overall", "ASC"),
+}
+
+JOB_HASH_PREFIX_RE = re.compile(r"^[0-9a-f]{6,64}$")
+
+# Columnas del listado; el informe completo vive en otra tabla (comprimido con zlib en el hilo escritor)
+# para que las páginas del listado sean pequeñas
+LIST_COLUMNS = ("id", "created_at", "candidate", "source", "mode", "job_hash", "job_title", "overall", "status", "seconds")
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS analyses (
+        id INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL,
+        candidate TEXT,
+        source TEXT,
+        resume_hash TEXT NOT NULL,
+        job_hash TEXT NOT NULL,
+        job_title TEXT,
+        mode TEXT NOT NULL,
+        status TEXT NOT NULL,
+        overall INTEGER,
+        scores TEXT,
+        seconds REAL,
+        timings TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS analysis_reports (
+        id INTEGER PRIMARY KEY REFERENCES analyses(id) ON DELETE CASCADE,
+        report BLOB NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_candidate ON analyses(candidate)",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_job_hash ON analyses(job_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_created_at ON analyses(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_overall ON analyses(overall)",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_resume_hash ON analyses(resume_hash)",
+)
+
+# Función para calcular el identificador de una oferta (el mismo que agrupa la caché: texto normalizado)
+def job_hash(job_description):
+    normalized = normalize_job_description(job_description)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest() if normalized else ""
+
+# Función para obtener el título de una oferta para el listado: su primera línea no vacía
+def job_title(job_description):
+    for line in (job_description or "").splitlines():
+        if line.strip():
+            return line.strip()[:120]
+    return ""
+
+# Función para convertir lo que escribe el usuario (email o teléfono) en la identidad que se guarda
+def candidate_filter(value):
+    value = (value or "").strip().lower()
+    if not value or value.startswith(("email:", "phone:")):
+        return value or None
+    if "@" in value:
+        return "email:" + value
+    digits = "".join(char for char in value if char.isdigit())
+    return "phone:" + digits if digits else value
+
+# Función para leer una fecha del filtro (AAAA-MM-DD) como marca de tiempo local; vacía: sin filtro
+def parse_date(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return time.mktime(time.strptime(value, "%Y-%m-%d"))
+    except ValueError:
+        raise ValueError(f"Fecha no válida: {value} (use el formato AAAA-MM-DD)")
+
+MODE_LABELS = {"job_description": "Con descripción de puesto", "ats_general": "ATS general"}
+
+# Función para presentar una página del listado como filas de la tabla de la interfaz
+def format_rows(rows):
+    return [
+        [
+            row["id"],
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"])),
+            (row["candidate"] or "").split(":", 1)[-1],
+            row["source"] or "",
+            MODE_LABELS.get(row["mode"], row["mode"]),
+            f"{row['job_hash'][:12]} · {row['job_title']}" if row["job_hash"] else "",
+            row["overall"] if row["overall"] is not None else "",
+            row["status"],
+            row["seconds"] if row["seconds"] is not None else "",
+        ]
+        for row in rows
+    ]
+
+ROW_HEADERS = ["ID", "Fecha", "Candidato", "Archivo", "Modo", "Oferta", "Puntuación", "Estado", "Segundos"]
+
+# Función para presentar un análisis guardado: datos, tiempos por etapa e informe completo
+def format_entry(entry):
+    if entry is None:
+        return "*No se encontró el análisis.*"
+    lines = [
+        f"### Análisis #{entry['id']} · {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['created_at']))}",
+        "",
+        f"- **Candidato**: {(entry['candidate'] or 'no identificado').split(':', 1)[-1]}",
+        f"- **Archivo**: {entry['source'] or '-'}",
+        f"- **Modo**: {MODE_LABELS.get(entry['mode'], entry['mode'])}",
+    ]
+    if entry["job_hash"]:
+        lines.append(f"- **Oferta**: `{entry['job_hash'][:12]}` {entry['job_title']}")
+    lines.append(f"- **Puntuación**: {entry['overall'] if entry['overall'] is not None else 'no disponible'}")
+    if entry["timings"]:
+        stages = ", ".join(f"{name} {seconds:.2f} s" for name, seconds in entry["timings"].items())
+        lines.append(f"- **Tiempos**: {entry['seconds']} s en total ({stages})")
+    return "\n".join(lines) + "\n\n---\n\n" + (entry["report"] or "")
+
+# Historial de análisis en SQLite (WAL). Las inserciones pasan por una cola que vacía un único hilo escritor
+# en lotes, fuera del camino de la petición; las consultas usan su propia conexión y no esperan al escritor.
+class AnalysisHistory:
+    def __init__(self, path=DEFAULT_HISTORY_PATH, enabled=ENABLED, queue_size=QUEUE_SIZE, batch_size=WRITE_BATCH):
+        self.path = path
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.dropped = 0
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    # Conexión de lectura perezosa, compartida por los hilos de Gradio protegida por el lock
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    # Encola un análisis para guardarlo; nunca bloquea ni lanza excepciones a quien lo llama
+    def record(self, entry):
+        if not self.enabled:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="ats-history-writer", daemon=True)
+                self._writer.start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Historial: cola llena, se descarta el análisis (%s descartados)", self.dropped)
+
+    def _write_loop(self):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            logger.error("Historial: no se puede abrir %s: %s", self.path, e)
+            conn = None
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [entry for entry in batch if entry is not None]
+            if conn is not None and entries:
+                try:
+                    self._insert(conn, entries)
+                except sqlite3.Error as e:
+                    logger.error("Historial: no se pudieron guardar %s análisis: %s", len(entries), e)
+            for _ in batch:
+                self._queue.task_done()
+            if len(entries) < len(batch):
+                if conn is not None:
+                    conn.close()
+                return
+
+    def _insert(self, conn, entries):
+        conn.execute("BEGIN")
+        try:
+            for entry in entries:
+                cursor = conn.execute(
+                    """INSERT INTO analyses (created_at, candidate, source, resume_hash, job_hash, job_title, mode,
+                                             status, overall, scores, seconds, timings)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        entry.get("created_at", time.time()), entry.get("candidate"), entry.get("source"),
+                        entry["resume_hash"], entry.get("job_hash", ""), entry.get("job_title"), entry["mode"],
+                        entry.get("status", "ok"), entry.get("overall"), json.dumps(entry.get("scores") or {}),
+                        entry.get("seconds"), json.dumps(entry.get("timings") or {}),
+                    ),
+                )
+                report = zlib.compress((entry.get("report") or "").encode("utf-8"))
+                conn.execute("INSERT INTO analysis_reports (id, report) VALUES (?, ?)", (cursor.lastrowid, report))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    # Espera a que se escriban los análisis encolados (al terminar un lote o antes de consultar en pruebas)
+    def flush(self):
+        if self._writer is not None:
+            self._queue.join()
+
+    # Página del listado con paginación por cursor: el coste no crece con el número de página.
+    # Devuelve las filas (diccionarios) y el cursor de la página siguiente (None si es la última).
+    def query(self, candidate=None, posting=None, mode=None, since=None, until=None, min_score=None, max_score=None,
+              order="Más recientes", after=None, page_size=PAGE_SIZE):
+        if not self.enabled:
+            return [], None
+        column, direction = SORT_ORDERS.get(order, SORT_ORDERS["Más recientes"])
+        conditions, params = self._filters(candidate, posting, mode, since, until, min_score, max_score)
+        if column == "overall":
+            conditions.append("overall IS NOT NULL")
+        if after is not None:
+            comparison = "<" if direction == "DESC" else ">"
+            if column == "id":
+                conditions.append(f"id {comparison} ?")
+                params.append(after[-1])
+            else:
+                conditions.append(f"(overall, id) {comparison} (?, ?)")
+                params += list(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order_by = "id " + direction if column == "id" else f"overall {direction}, id {direction}"
+        sql = f"SELECT {', '.join(LIST_COLUMNS)} FROM analyses {where} ORDER BY {order_by} LIMIT ?"
+        try:
+            with self._lock:
+                rows = self._connection().execute(sql, params + [page_size + 1]).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Historial: error al consultar: %s", e)
+            return [], None
+        rows = [dict(zip(LIST_COLUMNS, row)) for row in rows]
+        if len(rows) <= page_size:
+            return rows, None
+        last = rows[page_size - 1]
+        return rows[:page_size], (last["overall"], last["id"]) if column == "overall" else (last["id"],)
+
+    def _filters(self, candidate, posting, mode, since, until, min_score, max_score):
+        conditions, params = [], []
+        candidate = candidate_filter(candidate)
+        if candidate:
+            conditions.append("candidate = ?")
+            params.append(candidate)
+        posting = (posting or "").strip()
+        if posting:
+            # Se acepta el identificador que muestra el listado (o su prefijo) o el texto completo de la oferta
+            if JOB_HASH_PREFIX_RE.match(posting):
+                conditions.append("job_hash >= ? AND job_hash < ?")
+                params += [posting, posting + "g"]
+            else:
+                conditions.append("job_hash = ?")
+                params.append(job_hash(posting))
+        if mode:
+            conditions.append("mode = ?")
+            params.append(mode)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        if min_score is not None:
+            conditions.append("overall >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            conditions.append("overall <= ?")
+            params.append(max_score)
+        return conditions, params
+
+    # Análisis completo (puntajes, tiempos e informe) o None si no existe
+    def get(self, analysis_id):
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    f"""SELECT {', '.join('a.' + column for column in LIST_COLUMNS)}, a.resume_hash, a.scores, a.timings, r.report
+                        FROM analyses a LEFT JOIN analysis_reports r ON r.id = a.id WHERE a.id = ?""",
+                    (analysis_id,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Historial: error al consultar: %s", e)
+            return None
+        if row is None:
+            return None
+        entry = dict(zip(LIST_COLUMNS + ("resume_hash", "scores", "timings", "report"), row))
+        entry["scores"] = json.loads(entry["scores"] or "{}")
+        entry["timings"] = json.loads(entry["timings"] or "{}")
+        entry["report"] = zlib.decompress(entry["report"]).decode("utf-8") if entry["report"] else ""
+        return entry
+
+    # Escribe lo pendiente y cierra las conexiones (se registra con atexit)
+    def close(self):
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+        self._writer = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
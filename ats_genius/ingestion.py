@@ -0,0 +1,266 @@
+import multiprocessing
+import os
+import threading
+from collections import Counter
+
+# Límites de ingesta (configurables por variables de entorno)
+MAX_PDF_BYTES = int(os.environ.get("ATS_PDF_MAX_MB", 10)) * 1024 * 1024
+MAX_PDF_PAGES = int(os.environ.get("ATS_PDF_MAX_PAGES", 10))
+PARSE_TIMEOUT_SECONDS = float(os.environ.get("ATS_PDF_TIMEOUT", 20))
+PARSER_PROCESSES = int(os.environ.get("ATS_PDF_WORKERS", os.cpu_count() or 1))
+WORKER_MEMORY_MB = int(os.environ.get("ATS_PDF_WORKER_MEMORY_MB", 1024))
+
+# Documento de currículum con todo lo que necesitamos del PDF, obtenido en una sola apertura
+class ResumeDocument:
+    __slots__ = (
+        "pages", "word_count", "file_size", "page_count", "metadata",
+        "fonts", "colors", "block_count", "image_count", "column_count",
+    )
+
+    def __init__(self, pages, file_size, page_count, metadata, fonts, colors, block_count, image_count, column_count):
+        self.pages = tuple(pages)
+        self.word_count = sum(len(page.split()) for page in self.pages)
+        self.file_size = file_size
+        self.page_count = page_count
+        self.metadata = metadata
+        self.fonts = fonts
+        self.colors = colors
+        self.block_count = block_count
+        self.image_count = image_count
+        self.column_count = column_count
+
+    @property
+    def text(self):
+        return "".join(self.pages)
+
+    @property
+    def file_size_mb(self):
+        return self.file_size / (1024 * 1024)
+
+# Función para leer los bytes del archivo subido (ruta, objeto con .name o bytes), rechazando los demasiado grandes
+def read_pdf_bytes(pdf_file, max_bytes=MAX_PDF_BYTES):
+    if isinstance(pdf_file, (bytes, bytearray)):
+        data = bytes(pdf_file)
+        size = len(data)
+    else:
+        path = getattr(pdf_file, "name", pdf_file)
+        size = os.path.getsize(path)
+        data = None
+    if max_bytes and size > max_bytes:
+        raise ValueError(f"El PDF ocupa {size / (1024 * 1024):.1f} MB y el máximo permitido es {max_bytes / (1024 * 1024):.0f} MB.")
+    if data is None:
+        with open(path, "rb") as fh:
+            data = fh.read()
+    return data
+
+# Función para estimar el número de columnas de una página a partir de sus bloques de texto
+def _estimate_columns(page_width, block_x0s):
+    left = sum(1 for x0 in block_x0s if x0 < page_width * 0.4)
+    right = len(block_x0s) - left
+    return 2 if left >= 3 and right >= 3 else 1
+
+# Función de ingesta: abre el PDF una única vez desde los bytes y extrae texto, métricas y diseño.
+# Sólo se leen las primeras max_pages páginas: un CV nunca necesita más.
+def load_resume_document(pdf_file, max_pages=MAX_PDF_PAGES, max_bytes=MAX_PDF_BYTES):
+    # PyMuPDF se importa aquí: el proceso principal sólo lo necesita si analiza sin pool de procesos
+    import pymupdf as fitz
+
+    data = read_pdf_bytes(pdf_file, max_bytes)
+    pages = []
+    fonts = Counter()
+    colors = Counter()
+    block_count = 0
+    image_count = 0
+    column_count = 1
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page_number in range(min(doc.page_count, max_pages or doc.page_count)):
+            page = doc[page_number]
+            # Una sola TextPage por página sirve tanto para el texto plano como para el diseño
+            textpage = page.get_textpage()
+            pages.append(page.get_text("text", textpage=textpage))
+            layout = page.get_text("dict", textpage=textpage)
+
+            block_x0s = []
+            for block in layout["blocks"]:
+                if block.get("type") != 0:
+                    continue
+                block_count += 1
+                block_x0s.append(block["bbox"][0])
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        chars = len(span["text"].strip())
+                        if chars:
+                            fonts[span["font"]] += chars
+                            colors[f"#{span['color']:06x}"] += chars
+
+            column_count = max(column_count, _estimate_columns(page.rect.width, block_x0s))
+            image_count += len(page.get_images())
+
+        page_count = doc.page_count
+        metadata = dict(doc.metadata or {})
+
+    document = ResumeDocument(
+        pages, len(data), page_count, metadata,
+        dict(fonts.most_common()), dict(colors.most_common()),
+        block_count, image_count, column_count,
+    )
+    if not document.text.strip():
+        raise ValueError("El texto extraído del currículum está vacío. Por favor, cargue un PDF diferente.")
+    return document
+
+# Función para extraer texto de un PDF cargado usando PyMuPDF
+def extract_text_from_pdf(pdf_file):
+    try:
+        return load_resume_document(pdf_file).text
+    except Exception as e:
+        return f"Error al leer PDF: {e}"
+
+# Función para calcular métricas adicionales del PDF
+def calculate_metrics(pdf_file, text):
+    # Calcular el número de palabras
+    word_count = len(text.split())
+    
+    # Calcular el tamaño del archivo en MB
+    file_size_mb = os.path.getsize(getattr(pdf_file, "name", pdf_file)) / (1024 * 1024)
+    
+    # Podemos añadir métricas adicionales específicas de PyMuPDF: sólo se abre el PDF para leer su
+    # número de páginas y sus metadatos, sin extraer texto ni diseño
+    try:
+        import pymupdf as fitz
+
+        with fitz.open(getattr(pdf_file, "name", pdf_file)) as doc:
+            return word_count, file_size_mb, doc.page_count, dict(doc.metadata or {})
+    except Exception:
+        # Si hay algún error, devolvemos solo las métricas básicas
+        return word_count, file_size_mb, None, None
+
+# Tareas de los procesos de análisis: extraer el CV o renderizar una página con los errores resaltados
+def _run_task(task, args, max_pages):
+    if task == "render":
+        from .highlights import render_page
+        return render_page(*args)
+    return load_resume_document(args[0], max_pages, max_bytes=None)
+
+# Bucle de un proceso de análisis de PDF: recibe una tarea con los bytes del PDF y devuelve su
+# resultado (o el error como texto)
+def _parser_worker(conn, max_pages, memory_mb):
+    # Un PDF con imágenes gigantes no puede hacer crecer la memoria del proceso sin límite
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+    while True:
+        try:
+            task, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send((True, _run_task(task, args, max_pages)))
+        except MemoryError:
+            conn.send((False, "El PDF necesita demasiada memoria para procesarse."))
+        except Exception as e:
+            # Las excepciones de MuPDF no siempre se pueden serializar: se envía sólo el mensaje
+            conn.send((False, str(e) or type(e).__name__))
+
+# Proceso de análisis y su extremo de la tubería
+class _ParserWorker:
+    __slots__ = ("process", "conn")
+
+    def __init__(self, context, max_pages, memory_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_parser_worker, args=(child_conn, max_pages, memory_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+# Pool acotado de procesos para analizar PDF fuera de los hilos de Gradio. Cada documento tiene
+# un tiempo máximo; si lo supera, sólo se mata el proceso que lo estaba analizando. Las páginas
+# con los errores resaltados se renderizan en los mismos procesos y con los mismos límites.
+class PdfParserPool:
+    def __init__(self, processes=PARSER_PROCESSES, timeout=PARSE_TIMEOUT_SECONDS, max_pages=MAX_PDF_PAGES,
+                 max_bytes=MAX_PDF_BYTES, memory_mb=WORKER_MEMORY_MB):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.memory_mb = memory_mb
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = []
+        self._created = 0
+        # Avisa cuando queda un proceso libre o hueco para crear otro (también al descartar uno bloqueado)
+        self._available = threading.Condition()
+
+    # Toma un proceso libre; se crean bajo demanda hasta el máximo y después se espera a que quede uno libre
+    # o a que se descarte alguno, en cuyo caso se crea su sustituto
+    def _acquire(self):
+        with self._available:
+            while not self._idle and self._created >= self.processes:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return _ParserWorker(self._context, self.max_pages, self.memory_mb)
+        except Exception:
+            self._forget()
+            raise
+
+    def _release(self, worker):
+        with self._available:
+            self._idle.append(worker)
+            self._available.notify()
+
+    def _forget(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _discard(self, worker):
+        worker.kill()
+        self._forget()
+
+    # Analiza un PDF y devuelve su ResumeDocument; con processes=0 se analiza en el propio hilo
+    def parse(self, pdf_file):
+        return self._run("parse", (read_pdf_bytes(pdf_file, self.max_bytes),))
+
+    # Renderiza una página con los errores resaltados y devuelve (PNG, hallazgos encontrados por tipo)
+    def render(self, data, page_number, dpi, highlights):
+        if not 0 <= page_number < self.max_pages:
+            raise ValueError(f"Sólo se pueden mostrar las primeras {self.max_pages} páginas.")
+        return self._run("render", (data, page_number, dpi, highlights))
+
+    def _run(self, task, args):
+        if self.processes <= 0:
+            return _run_task(task, args, self.max_pages)
+
+        worker = self._acquire()
+        try:
+            worker.conn.send((task, args))
+            finished = worker.conn.poll(self.timeout)
+            if finished:
+                ok, result = worker.conn.recv()
+        except (EOFError, OSError):
+            # El proceso murió (por ejemplo, al superar el límite de memoria)
+            self._discard(worker)
+            raise ValueError("El PDF no se pudo procesar con los recursos permitidos.")
+        if not finished:
+            self._discard(worker)
+            raise TimeoutError(f"El PDF tardó más de {self.timeout:g} s en procesarse.")
+        self._release(worker)
+        if not ok:
+            raise ValueError(result)
+        return result
+
+    def close(self):
+        with self._available:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            self._discard(worker)
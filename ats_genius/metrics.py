@@ -0,0 +1,231 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# La instrumentación está desactivada por defecto; ATS_METRICS=1 la activa y ATS_TRACE_LOG añade la traza JSONL
+TRACE_LOG_PATH = os.environ.get("ATS_TRACE_LOG") or None
+ENABLED = os.environ.get("ATS_METRICS", "").lower() in ("1", "true", "yes", "on") or TRACE_LOG_PATH is not None
+
+# Límites de los histogramas
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+PAGE_BUCKETS = (1, 2, 3, 4, 5, 10, 20, 50)
+BYTE_BUCKETS = tuple(2 ** power * 1024 for power in range(6, 15, 2))
+
+# Métricas expuestas: tipo, ayuda y límites (sólo histogramas)
+METRICS = {
+    "ats_requests_total": ("counter", "Análisis terminados por modo y estado", None),
+    "ats_request_seconds": ("histogram", "Duración total de cada análisis", SECONDS_BUCKETS),
+    "ats_stage_seconds": ("histogram", "Duración de cada etapa del análisis", SECONDS_BUCKETS),
+    "ats_pdf_pages": ("histogram", "Páginas de los PDF recibidos", PAGE_BUCKETS),
+    "ats_pdf_bytes": ("histogram", "Tamaño de los PDF recibidos", BYTE_BUCKETS),
+    "ats_cache_requests_total": ("counter", "Consultas a la caché de resultados", None),
+    "ats_gemini_tokens_total": ("counter", "Tokens de Gemini por tipo (prompt, cached, output)", None),
+    "ats_gemini_retries_total": ("counter", "Reintentos de llamadas a Gemini por tipo de error", None),
+    "ats_gemini_coalesced_total": ("counter", "Peticiones servidas por una llamada idéntica en curso", None),
+    "ats_duplicate_reuse_total": ("counter", "Informes reutilizados de un CV casi idéntico ya analizado", None),
+}
+
+# Registro de contadores e histogramas en memoria, con salida en el formato de texto de Prometheus
+class MetricsRegistry:
+    def __init__(self, definitions=METRICS):
+        self.definitions = definitions
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self.definitions[name][2]
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            histogram[0][bisect.bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(value[0]), value[1], value[2])) for key, value in self._histograms.items())
+
+        lines = []
+        described = set()
+        for (name, labels), value in counters:
+            if name not in described:
+                described.add(name)
+                lines += [f"# HELP {name} {self.definitions[name][1]}", f"# TYPE {name} counter"]
+            lines.append(f"{name}{self._labels(labels)} {value:g}")
+
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in described:
+                described.add(name)
+                lines += [f"# HELP {name} {self.definitions[name][1]}", f"# TYPE {name} histogram"]
+            cumulative = 0
+            for bound, bucket_count in zip(self.definitions[name][2] + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(labels)} {total:g}")
+            lines.append(f"{name}_count{self._labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+_trace_lock = threading.Lock()
+_trace_file = None
+
+# Función para activar o desactivar la instrumentación en tiempo de ejecución (benchmarks, lotes)
+def configure(enabled=True, trace_path=None):
+    global ENABLED, TRACE_LOG_PATH, _trace_file
+    with _trace_lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+        ENABLED = enabled or trace_path is not None
+        TRACE_LOG_PATH = trace_path
+
+def increment(name, amount=1, **labels):
+    if ENABLED:
+        registry.increment(name, amount, **labels)
+
+def observe(name, value, **labels):
+    if ENABLED:
+        registry.observe(name, value, **labels)
+
+# Función para escribir un registro en la traza JSONL (una línea por análisis)
+def _write_trace(record):
+    global _trace_file
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _trace_lock:
+        if TRACE_LOG_PATH is None:
+            return
+        if _trace_file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(TRACE_LOG_PATH)), exist_ok=True)
+            _trace_file = open(TRACE_LOG_PATH, "a", encoding="utf-8")
+        _trace_file.write(line)
+        _trace_file.flush()
+
+# Cronómetro de una etapa: suma su duración a la traza y al histograma de etapas
+class _StageTimer:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.record_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+# Traza de un análisis: duración de cada etapa y atributos (páginas, tokens, caché...).
+# Puede recibir datos de varios hilos a la vez (peticiones por categoría del análisis en paralelo).
+class Trace:
+    __slots__ = ("name", "started", "stages", "attributes", "_lock")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.attributes = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+    # Registra una etapa medida fuera de un bloque with (por ejemplo, hasta el primer fragmento)
+    def record_stage(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        observe("ats_stage_seconds", seconds, stage=name)
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add(self, name, amount):
+        with self._lock:
+            self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def finish(self, status="ok"):
+        elapsed = time.perf_counter() - self.started
+        # Una traza forzada (por ejemplo, para el historial) no alimenta las métricas si están desactivadas
+        increment("ats_requests_total", mode=self.name, status=status)
+        observe("ats_request_seconds", elapsed, mode=self.name)
+        if TRACE_LOG_PATH is not None:
+            _write_trace({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "mode": self.name,
+                "status": status,
+                "seconds": round(elapsed, 6),
+                "stages": {name: round(value, 6) for name, value in self.stages.items()},
+                **self.attributes,
+            })
+
+# Versiones vacías que se usan con la instrumentación desactivada: no miden ni guardan nada
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+class _NullTrace:
+    __slots__ = ()
+    _timer = _NullTimer()
+
+    def stage(self, name):
+        return self._timer
+
+    def record_stage(self, name, seconds):
+        pass
+
+    def set(self, **attributes):
+        pass
+
+    def add(self, name, amount):
+        pass
+
+    def finish(self, status="ok"):
+        pass
+
+NULL_TRACE = _NullTrace()
+
+# Función para empezar la traza de un análisis (la traza vacía si la instrumentación está desactivada
+# y nadie más necesita sus datos; force la crea igualmente, por ejemplo para el historial)
+def start_trace(name, force=False):
+    return Trace(name) if ENABLED or force else NULL_TRACE
+
+# Función para exponer las métricas en /metrics junto a la aplicación de Gradio
+def create_metrics_app(demo, path="/"):
+    import gradio as gr
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    server = FastAPI()
+
+    @server.get("/metrics")
+    def metrics_endpoint():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return gr.mount_gradio_app(server, demo, path=path)
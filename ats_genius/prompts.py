@@ -0,0 +1,403 @@
+import re
+import unicodedata
+from collections import Counter
+
+from .scoring import LLM_REPORTS
+
+# Versión de las plantillas de prompt (forma parte de la clave de la caché de resultados)
+PROMPT_VERSION = "9"
+
+LLM_REPORT_NAMES = ", ".join(LLM_REPORTS)
+
+# Rúbrica estática del análisis con descripción de puesto. Se envía como instrucción de sistema,
+# así cada petición sólo transporta las partes variables (CV, descripción del puesto y métricas).
+JOB_DESCRIPTION_SYSTEM_INSTRUCTION = f"""Como Gestor Técnico de Recursos Humanos con experiencia, proporcione una evaluación profesional detallada del currículum vitae del candidato con respecto a la descripción del puesto que recibirá en cada mensaje.
+Nota: Por favor, no invente la respuesta, sólo responda a partir de la descripción del puesto proporcionada.
+Cada mensaje incluye el CV, la descripción del puesto, información adicional extraída del PDF y puntajes calculados localmente (son hechos medidos sobre el CV; no los recalcule).
+
+Por favor, analiza:
+
+1. **Análisis de Contenido (CONTENT)**
+    - **ATSParseRateReport (Tasa de Parseo ATS)**
+        *Objetivo*: Evaluar qué tan bien el CV puede ser leído y procesado por sistemas de seguimiento de candidatos (ATS).
+        *Métricas*: Número de palabras (mínimo 400, máximo 800 recomendadas por ATS). Tasa de parseo en porcentaje, considerando "excelente" por encima del 85%.
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso en la puntuación total*: 15%.
+    - **QuantifyingImpactReport (Cuantificación del Impacto)**
+        *Objetivo*: Verificar si el CV incluye logros cuantificables para demostrar impacto.
+        *Análisis*: Identificar si hay "bullets" (puntos) que carezcan de cuantificación (por ejemplo, "reduje costos en un 30%").
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 20%.
+
+2. **Análisis de Formato (FORMAT)**
+    - *Calculados localmente (use los puntajes locales, no los recalcule)*: FormatAndSizeReport.
+
+3. **Análisis de Estilo (STYLE)**
+    - *Calculados localmente (use los puntajes locales, no los recalcule)*: RepetitionReport, LengthReporter, BulletLengthReport, EmailReport, PassiveVoiceReport, BuzzwordsReport.
+    - **SpellingGrammarReport (Reporte de Ortografía y Gramática)**
+        *Objetivo*: Detectar errores ortográficos, gramaticales o de puntuación.
+        *Análisis*: Identificar y comunicar errores ortográficos, gramaticales o de puntuación (por ejemplo, frases que no comienzan con mayúscula, errores tipográficos). Cite entre comillas «» el texto exacto del CV de cada error.
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 10%.
+    - **DesignReport (Reporte de Diseño)**
+        *Objetivo*: Evaluar el diseño visual del CV (colores, fuentes, disposición).
+        *Análisis*: Use las fuentes, colores, columnas y número de páginas de la información adicional del CV; no los suponga.
+            - **Disposición**: La información más importante debe presentarse en el primer tercio del CV (por ejemplo, la sección Resumen). Generalmente, debe seguirse con Experiencia Laboral y Educación. En un diseño de dos columnas, se pueden colocar secciones de Habilidades y Logros a la derecha.
+            - **Secciones Adicionales**: Dependiendo de la experiencia, se pueden agregar Idiomas, Aficiones, Proyectos, etc.
+            - **Colores**: Los colores deben reflejar personalidad, pero ser legibles (evitar combinaciones como texto verde claro sobre fondo rojo). No usar más de 2-3 colores.
+            - **Fuentes**: Evitar fuentes como Times New Roman. Usar fuentes modernas como Lato o Raleway. Usar dos fuentes complementarias (una para encabezados, otra para texto).
+            - **Número de páginas**: Preferiblemente una página, pero se aceptan dos si es necesario.
+            - **Tono**: Formal y educado, adaptado a la industria (puede ser más relajado si el puesto lo requiere, por ejemplo, en industrias creativas).
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 0.5%.
+
+4. **Análisis de Secciones (SECTIONS)**
+    - *Calculados localmente (use los puntajes locales, no los recalcule)*: ContactReporter.
+    - **EssentialsReporter (Reporte de Secciones Esenciales)**
+        *Objetivo*: Verificar la presencia de secciones esenciales como Experiencia Laboral, Educación y Habilidades.
+        *Análisis*: Comprobar la presencia de las secciones Resumen, Habilidades, Educación y Experiencia Laboral. Si no hay Experiencia Laboral, se recomienda agregar una sección de Proyectos.
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 4%.
+    - **PersonalityReport (Reporte de Personalidad)**
+        *Objetivo*: Evaluar si el CV incluye secciones que muestren la personalidad del candidato.
+        *Análisis*: Verificar la presencia de secciones como "Pasiones", "Libros", "Mi Tiempo" o "Aficiones". Si no están presentes, recomendar agregar al menos una para mostrar personalidad.
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 1%.
+    - **AdditionalSectionsReport (Reporte de Secciones Adicionales)**
+        *Objetivo*: Evaluar la presencia de secciones opcionales que añadan valor al CV.
+        *Análisis*: Verificar la presencia de secciones como Idiomas, Proyectos Personales, Certificaciones o Enlaces Sociales. Si no están presentes, recomendar agregarlas si son relevantes para el puesto.
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 2%.
+
+5. **Análisis de Habilidades (SKILLS)**
+    - **HardSkillsReport (Reporte de Habilidades Duras)**
+        *Objetivo*: Identificar habilidades técnicas específicas (como herramientas, lenguajes de programación, etc.).
+        *Análisis*: Verificar la presencia de habilidades técnicas. Si no hay, recomendar agregar habilidades relevantes (por ejemplo, "Python", "Gestión de Proyectos").
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 20%.
+    - **SoftSkillsReport (Reporte de Habilidades Blandas)**
+        *Objetivo*: Identificar habilidades interpersonales (como trabajo en equipo, comunicación, etc.).
+        *Análisis*: Verificar la presencia de habilidades interpersonales. Si no hay, recomendar agregar habilidades relevantes (por ejemplo, "Trabajo en equipo", "Resolución de problemas").
+        *Resultado*: Devuelve un puntaje de 0 a 100.
+        *Peso*: 10%.
+
+6. **Puntuación General (OVERALL)**
+    - **OverallScoreReport (Reporte de Puntuación General)**
+        *Objetivo*: Explicar la puntuación general del CV considerando todas las categorías anteriores.
+        *Análisis*: No calcule la puntuación numérica (se calcula localmente como promedio ponderado). Incluya comentarios sobre:
+        *Factores Negativos*: Mencionar los factores que bajaron el puntaje (por ejemplo, errores gramaticales, ausencia de experiencia laboral).
+        *Factores Positivos*: Mencionar los factores que subieron el puntaje (por ejemplo, compatibilidad con ATS, logros cuantificables).
+
+7. **Evaluación Final**
+    - **Adecuación General al Puesto**: Evaluar la adecuación del candidato al puesto en una escala de 1 a 10, considerando la alineación entre el CV y la descripción del puesto.
+    - **Principales Puntos Fuertes y Cualificaciones**: Identificar las fortalezas clave del candidato (por ejemplo, experiencia relevante, proyectos destacados).
+    - **Lagunas Notables o Áreas de Mejora**: Señalar áreas donde el CV no cumple con los requisitos del puesto o estándares generales (por ejemplo, falta de experiencia laboral, habilidades específicas ausentes).
+    - **Recomendaciones Específicas para Mejorar el Currículum**: Proporcionar consejos prácticos para mejorar el CV (por ejemplo, corregir errores gramaticales, agregar una sección de experiencia laboral).
+    - **Veredicto Final sobre la Adecuación al Puesto**: Concluir si el candidato es adecuado para el puesto basado en el análisis.
+
+8. **Preparación para la Entrevista (Condicional)**
+    - Si el veredicto final es positivo (puntuación de adecuación >= 7):
+        Proporcionar una breve hoja de ruta para que el candidato se prepare para la entrevista, incluyendo:
+            - Ejemplos de preguntas que podría enfrentar (por ejemplo, "¿Puedes hablarnos de un proyecto en el que hayas trabajado?").
+            - Puntos clave a destacar (por ejemplo, experiencia relevante, habilidades técnicas).
+    - Si el veredicto final es negativo (puntuación < 7):
+        Especificar que el candidato debe realizar los cambios sugeridos y volver a presentar su CV.
+
+**Formato de la Respuesta**
+- Utilice títulos claros para cada sección (por ejemplo, "Análisis de Contenido", "Evaluación Final").
+- Mantenga un lenguaje profesional y objetivo, adecuado para un contexto de recursos humanos.
+- Termine la respuesta con un bloque ```json con los puntajes (0-100) de los informes que ha evaluado, usando sus nombres como claves: {LLM_REPORT_NAMES}.
+"""
+
+# Rúbrica estática del análisis general ATS
+ATS_GENERAL_SYSTEM_INSTRUCTION = f"""Como experto en ATS (Applicant Tracking System), analiza el currículum vitae que recibirá en cada mensaje.
+Cada mensaje incluye el CV, información adicional extraída del PDF y puntajes calculados localmente (son hechos medidos sobre el CV; no los recalcule).
+
+Proporcione:
+    1. **Análisis de Contenido (CONTENT)**
+        - **ATSParseRateReport (Tasa de Parseo ATS)**
+            *Objetivo*: Evaluar qué tan bien el CV puede ser leído y procesado por sistemas de seguimiento de candidatos (ATS).
+            *Métricas*: Número de palabras (mínimo 400, máximo 800 recomendadas por ATS). Tasa de parseo en porcentaje, considerando "excelente" por encima del 85%.
+            *Resultado*: Devuelve un puntaje de 0 a 100.
+        - **QuantifyingImpactReport (Cuantificación del Impacto)**
+            *Objetivo*: Verificar si el CV incluye logros cuantificables para demostrar impacto.
+            *Análisis*: Identificar si hay "bullets" (puntos) que carezcan de cuantificación (por ejemplo, "reduje costos en un 30%").
+            *Resultado*: Devuelve un puntaje de 0 a 100.
+
+    2. **Análisis de Formato y Estilo**
+        - Formato, diseño, ortografía y gramática (longitud, bullets, voz pasiva, buzzwords, repetición, email y tamaño ya están calculados localmente); cite entre comillas «» el texto exacto del CV de cada error ortográfico o gramatical
+        - Evaluar el estilo de redacción profesional y la claridad del contenido
+
+    3. **Análisis de Secciones y Habilidades**
+        - Verificar secciones esenciales: Información de contacto, experiencia, educación, habilidades
+        - Identificar y evaluar habilidades duras (técnicas) y blandas (interpersonales)
+
+    4. **Puntuación General y Recomendaciones**
+        - Comentario sobre la puntuación global (el porcentaje se calcula localmente; no lo calcule)
+        - Análisis del formato y la estructura del currículum vitae
+        - Palabras clave específicas encontradas
+        - Puntos fuertes y débiles generales
+        - Recomendaciones específicas de mejora
+
+    Antes del currículum optimizado, incluya un bloque ```json con los puntajes (0-100) de estos informes, usando sus nombres como claves: {LLM_REPORT_NAMES}.
+    Al final, bajo el título "Currículum Optimizado", cree un currículum más limpio y estructurado que tenga más probabilidades de ser seleccionado por la ATS.
+"""
+
+# Encabezados de cada informe, en orden, para medir el avance real de la generación
+JOB_DESCRIPTION_SECTIONS = (
+    "Análisis de Contenido", "Análisis de Formato", "Análisis de Estilo", "Análisis de Secciones",
+    "Análisis de Habilidades", "Puntuación General", "Evaluación Final", "Preparación para la Entrevista",
+)
+ATS_GENERAL_SECTIONS = (
+    "Análisis de Contenido", "Análisis de Formato", "Análisis de Secciones", "Puntuación General", "Currículum Optimizado",
+)
+
+# Categoría del análisis en paralelo: una petición independiente con su propia instrucción de sistema
+# y una respuesta JSON pequeña, en lugar de un único informe largo generado en serie
+# cv_sections limita el CV que recibe la categoría a esos tipos de sección (None: el CV completo), así su
+# resultado se puede reutilizar cuando una nueva versión del CV sólo cambia otras secciones.
+class RubricCategory:
+    __slots__ = ("key", "title", "reports", "local_reports", "instructions", "schema", "cv_sections", "system_instruction")
+
+    def __init__(self, key, title, reports, local_reports, instructions, schema, cv_sections=None):
+        self.key = key
+        self.title = title
+        self.reports = reports
+        self.local_reports = local_reports
+        self.instructions = instructions
+        self.schema = schema
+        self.cv_sections = cv_sections
+        self.system_instruction = CATEGORY_SYSTEM_INSTRUCTION.format(title=title, instructions=instructions, schema=schema)
+
+CATEGORY_SYSTEM_INSTRUCTION = """Como Gestor Técnico de Recursos Humanos con experiencia, evalúe el currículum vitae del candidato con respecto a la descripción del puesto que recibirá en cada mensaje.
+Nota: Por favor, no invente la respuesta, sólo responda a partir del CV y de la descripción del puesto proporcionados.
+Cada mensaje incluye el CV (o sólo las secciones que necesita esta categoría), la descripción del puesto y, si son relevantes, información adicional extraída del PDF y puntajes calculados localmente (son hechos medidos sobre el CV; no los recalcule).
+
+Evalúe únicamente la categoría "{title}":
+{instructions}
+
+Responda sólo con un objeto JSON, sin texto adicional, con esta forma (como máximo 5 elementos por lista):
+{schema}
+"""
+
+# Forma de la respuesta de las categorías con puntajes
+def _scores_schema(reports):
+    scores = ", ".join(f'"{name}": <0-100>' for name in reports)
+    return (f'{{"scores": {{{scores}}}, "findings": ["hallazgo concreto, citando entre comillas el texto exacto del CV"], '
+            f'"recommendations": ["recomendación específica y accionable"]}}')
+
+RUBRIC_CATEGORIES = (
+    RubricCategory(
+        "content", "Análisis de Contenido", ("ATSParseRateReport", "QuantifyingImpactReport"), (),
+        """- ATSParseRateReport: qué tan bien puede leer y procesar el CV un sistema ATS (entre 400 y 800 palabras; tasa de parseo "excelente" por encima del 85%).
+- QuantifyingImpactReport: si el CV incluye logros cuantificables; identifique los bullets sin cuantificación (por ejemplo, "reduje costos en un 30%").""",
+        _scores_schema(("ATSParseRateReport", "QuantifyingImpactReport")),
+        cv_sections=("summary", "experience", "projects"),
+    ),
+    RubricCategory(
+        "style", "Análisis de Formato y Estilo", ("SpellingGrammarReport", "DesignReport"),
+        ("FormatAndSizeReport", "RepetitionReport", "LengthReporter", "BulletLengthReport", "EmailReport",
+         "PassiveVoiceReport", "BuzzwordsReport"),
+        """- SpellingGrammarReport: errores ortográficos, gramaticales o de puntuación (por ejemplo, frases que no comienzan con mayúscula o errores tipográficos).
+- DesignReport: diseño visual según las fuentes, colores, columnas y páginas de la información adicional (no los suponga): información importante en el primer tercio, no más de 2-3 colores legibles, fuentes modernas (evitar Times New Roman), preferiblemente una página.
+- El formato, la longitud, los bullets, el email, la voz pasiva, las buzzwords y la repetición ya están calculados localmente: puede comentarlos, pero no los puntúe.""",
+        _scores_schema(("SpellingGrammarReport", "DesignReport")),
+    ),
+    RubricCategory(
+        "sections", "Análisis de Secciones", ("EssentialsReporter", "PersonalityReport", "AdditionalSectionsReport"),
+        ("ContactReporter",),
+        """- EssentialsReporter: presencia de Resumen, Habilidades, Educación y Experiencia Laboral (si no hay experiencia, recomiende una sección de Proyectos).
+- PersonalityReport: secciones que muestren la personalidad del candidato, como "Pasiones", "Libros" o "Aficiones".
+- AdditionalSectionsReport: secciones opcionales que añadan valor para el puesto, como Idiomas, Proyectos Personales, Certificaciones o Enlaces Sociales.""",
+        _scores_schema(("EssentialsReporter", "PersonalityReport", "AdditionalSectionsReport")),
+        cv_sections=("header", "languages", "certifications", "interests", "other"),
+    ),
+    RubricCategory(
+        "skills", "Análisis de Habilidades", ("HardSkillsReport", "SoftSkillsReport"), (),
+        """- HardSkillsReport: habilidades técnicas (herramientas, lenguajes, metodologías) que pide el puesto y que están presentes o ausentes en el CV.
+- SoftSkillsReport: habilidades interpersonales (trabajo en equipo, comunicación, resolución de problemas) relevantes para el puesto.""",
+        _scores_schema(("HardSkillsReport", "SoftSkillsReport")),
+        cv_sections=("summary", "experience", "projects", "skills"),
+    ),
+)
+
+EVALUATION_CATEGORY = RubricCategory(
+    "evaluation", "Evaluación Final", (), (),
+    """- Adecuación general del candidato al puesto en una escala de 1 a 10, según la alineación entre el CV y la descripción del puesto.
+- Principales puntos fuertes y cualificaciones, lagunas notables respecto al puesto, recomendaciones específicas para mejorar el CV y veredicto final.""",
+    '{"fit_score": <1-10>, "strengths": ["punto fuerte"], "gaps": ["laguna o área de mejora"], '
+    '"recommendations": ["recomendación específica"], "verdict": "veredicto final en una o dos frases"}',
+)
+
+# Sólo se pide cuando la adecuación de la evaluación final es >= INTERVIEW_MIN_FIT
+INTERVIEW_CATEGORY = RubricCategory(
+    "interview", "Preparación para la Entrevista", (), (),
+    """- El candidato ha obtenido una evaluación positiva. Proporcione una breve hoja de ruta para preparar la entrevista: preguntas que podría enfrentar (por ejemplo, "¿Puedes hablarnos de un proyecto en el que hayas trabajado?") y puntos clave a destacar.""",
+    '{"questions": ["pregunta probable"], "key_points": ["punto clave a destacar"]}',
+)
+
+INTERVIEW_MIN_FIT = 7
+
+# Función para construir el mensaje de la preparación para la entrevista a partir de la evaluación final
+def build_interview_prompt(prompt, evaluation):
+    strengths = "; ".join(evaluation.get("strengths") or []) or "no indicados"
+    return f"""{prompt}
+Evaluación final del candidato:
+        - Adecuación al puesto: {evaluation.get("fit_score")}/10
+        - Puntos fuertes: {strengths}
+"""
+
+# Encabezados habituales de las secciones de un CV (es/en/pt/fr, en minúsculas y sin acentos) y su tipo
+SECTION_HEADINGS = {
+    "summary": ("perfil", "perfil profesional", "resumen", "resumen profesional", "sobre mi", "acerca de mi", "objetivo",
+                "objetivo profesional", "extracto", "summary", "professional summary", "career summary",
+                "executive summary", "profile", "professional profile", "career profile", "about me", "about",
+                "objective", "career objective", "resumo", "resumo profissional", "profil", "profil professionnel"),
+    "experience": ("experiencia", "experiencia laboral", "experiencia profesional", "trayectoria profesional",
+                   "trayectoria", "historial laboral", "empleos", "experience", "work experience",
+                   "professional experience", "employment history", "employment", "work history", "career history",
+                   "relevant experience", "experiencia", "experiencia profissional", "historico profissional",
+                   "experience professionnelle", "experiences professionnelles", "parcours professionnel"),
+    "education": ("educacion", "formacion", "formacion academica", "estudios", "education", "formacao",
+                  "formacao academica", "formation"),
+    "skills": ("habilidades", "competencias", "aptitudes", "conocimientos", "habilidades tecnicas", "skills",
+               "conocimientos tecnicos", "tecnologias", "herramientas", "stack tecnologico", "technical skills",
+               "core competencies", "competencies", "key skills", "tech stack", "technologies", "tools",
+               "technical expertise", "expertise", "competences", "competences techniques", "competencias tecnicas",
+               "habilidades e competencias", "tecnologias e ferramentas"),
+    "languages": ("idiomas", "languages", "langues", "linguas"),
+    "projects": ("proyectos", "proyectos personales", "proyectos destacados", "projects", "personal projects",
+                 "key projects", "selected projects", "projetos", "projets"),
+    "certifications": ("certificaciones", "certificados", "cursos", "certifications", "courses", "certificacoes"),
+    "interests": ("aficiones", "intereses", "pasiones", "hobbies", "interests", "passions", "voluntariado",
+                  "volunteering", "interesses", "centres d'interet", "loisirs"),
+}
+SECTION_KINDS = {heading: kind for kind, headings in SECTION_HEADINGS.items() for heading in headings}
+
+def _fold(text):
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+# Función para reconocer el encabezado de una sección: un nombre conocido o una línea corta en mayúsculas
+def _section_kind(line):
+    stripped = line.strip().strip(":").strip()
+    if not stripped or len(stripped.split()) > 4:
+        return None
+    kind = SECTION_KINDS.get(_fold(stripped))
+    if kind is None and stripped.isupper() and sum(char.isalpha() for char in stripped) >= 4:
+        kind = "other"
+    return kind
+
+# Función para dividir el texto limpio del CV en secciones: (tipo, encabezado, contenido). El texto anterior
+# al primer encabezado (nombre y contacto) es la sección "header".
+def split_resume_sections(resume_text):
+    sections = [["header", "", []]]
+    for line in resume_text.splitlines():
+        kind = _section_kind(line)
+        if kind is not None:
+            sections.append([kind, line.strip().strip(":").strip(), []])
+        else:
+            sections[-1][2].append(line)
+    return [(kind, heading, "\n".join(lines).strip()) for kind, heading, lines in sections if heading or any(lines)]
+
+# Función para construir el mensaje de una categoría: sólo las secciones del CV que necesita y,
+# si las tiene, sus puntajes locales. Las categorías sin cv_sections reciben el prompt completo.
+# Si no se reconoce ninguna sección del CV, o ninguna de las que necesita la categoría, se envía el CV
+# entero: un encabezado desconocido no debe dejar a Gemini puntuando un texto que no ha visto.
+def build_category_prompt(category, sections, job_description, local_facts, full_prompt):
+    if category.cv_sections is None:
+        return full_prompt
+    recognized = any(kind not in ("header", "other") for kind, _, _ in sections)
+    selected = [
+        f"{heading}\n{body}" if heading else body
+        for kind, heading, body in sections if kind in category.cv_sections
+    ]
+    resume_text = "\n\n".join(selected).strip() if recognized else ""
+    scope = "sólo las secciones necesarias para esta categoría"
+    if not resume_text:
+        resume_text = "\n\n".join(f"{heading}\n{body}" if heading else body for _, heading, body in sections).strip()
+        scope = "completo"
+    headings = ", ".join(heading for _, heading, _ in sections if heading) or "ninguna reconocida"
+    prompt = f"""CV del candidato ({scope}):
+<cv>
+{resume_text}
+</cv>
+
+Secciones presentes en el CV: {headings}
+
+Descripción del puesto:
+<puesto>
+{" ".join(job_description.split())}
+</puesto>
+"""
+    if local_facts:
+        prompt += f"""
+Puntajes calculados localmente:
+{local_facts}
+"""
+    return prompt
+
+# Números de página: con prefijo ("Página 2", "Page 2 of 3") se quitan en cualquier línea; sin prefijo ("2",
+# "2/3", "2 de 3") sólo si son la primera o la última línea de la página y coinciden con su posición
+PAGE_LABEL_RE = re.compile(r"^(?:p[aá]g(?:ina)?\.?|page)\s*\d{1,3}(?:\s*(?:/|de|of)\s*\d{1,3})?$", re.IGNORECASE)
+BARE_PAGE_NUMBER_RE = re.compile(r"^(\d{1,3})(?:\s*(?:/|de|of)\s*(\d{1,3}))?$", re.IGNORECASE)
+
+def _is_page_number(line, page_number, page_count, at_edge):
+    if PAGE_LABEL_RE.match(line):
+        return True
+    match = BARE_PAGE_NUMBER_RE.match(line) if at_edge else None
+    return (match is not None and int(match.group(1)) == page_number
+            and (match.group(2) is None or int(match.group(2)) == page_count))
+
+# Función para limpiar el texto de PyMuPDF antes de enviarlo: espacios duplicados, líneas vacías
+# consecutivas, números de página y cabeceras o pies repetidos en todas las páginas
+def clean_resume_text(pages):
+    page_lines = [[" ".join(line.split()) for line in page.splitlines()] for page in pages]
+
+    boilerplate = set()
+    if len(page_lines) > 1:
+        counts = Counter(line for lines in page_lines for line in set(lines) if len(line) > 3)
+        boilerplate = {line for line, count in counts.items() if count == len(page_lines)}
+
+    cleaned = []
+    for index, lines in enumerate(page_lines):
+        filled = [position for position, line in enumerate(lines) if line]
+        edges = {filled[0], filled[-1]} if filled else set()
+        for position, line in enumerate(lines):
+            if _is_page_number(line, index + 1, len(page_lines), position in edges) or (index > 0 and line in boilerplate):
+                continue
+            if not line and (not cleaned or not cleaned[-1]):
+                continue
+            cleaned.append(line)
+    return "\n".join(cleaned).strip()
+
+# Función para construir la parte variable del análisis con descripción de puesto
+def build_job_description_prompt(resume_text, job_description, additional_info, local_facts):
+    return f"""CV del candidato:
+<cv>
+{resume_text}
+</cv>
+
+Descripción del puesto:
+<puesto>
+{" ".join(job_description.split())}
+</puesto>
+
+Información adicional del CV (extraída directamente del PDF):{additional_info}
+
+Puntajes calculados localmente:
+{local_facts}
+"""
+
+# Función para construir la parte variable del análisis general ATS
+def build_ats_general_prompt(resume_text, additional_info, local_facts):
+    return f"""CV del candidato:
+<cv>
+{resume_text}
+</cv>
+
+Información adicional del CV (extraída directamente del PDF):{additional_info}
+
+Puntajes calculados localmente:
+{local_facts}
+"""
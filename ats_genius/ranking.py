@@ -0,0 +1,171 @@
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from .scoring import STOPWORDS
+
+# Tokens tipo "python", "c++", "c#", "node.js" o "ci/cd" (los acentos se eliminan antes)
+TOKEN_RE = re.compile(r"[a-z0-9](?:[a-z0-9+#./-]*[a-z0-9+#])?")
+
+# Términos que suelen indicar una habilidad técnica aunque aparezcan una sola vez en la oferta
+TECH_TOKEN_RE = re.compile(r"[0-9+#./]")
+
+# Función para normalizar el texto: minúsculas y sin acentos, para que "gestión" y "gestion" coincidan
+def normalize_text(text):
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+# Separadores de frase: los bigramas no cruzan comas, saltos de línea ni finales de frase
+SEGMENT_RE = re.compile(r"[,;:()\[\]|•\n]|\.(?:\s|$)")
+
+# Palabras habituales en las ofertas que no describen ninguna habilidad
+JOB_STOPWORDS = frozenset(normalize_text(word) for word in """
+buscamos busca requisitos requerido requeridos valorable valorables ofrecemos experiencia conocimientos conocimiento
+años candidato candidata puesto empresa persona perfil funciones imprescindible deseable incorporar incorporación
+nivel minimo mínimo plus trabajo equipo capacidad manejo seeking looking requirements required experience knowledge
+years candidate role position company team nice must strong ability skills work working join
+""".split())
+
+# Función para obtener los términos de un texto: palabras sin stopwords y bigramas dentro de cada frase
+def tokenize(text):
+    terms = []
+    bigrams = []
+    for segment in SEGMENT_RE.split(normalize_text(text)):
+        tokens = [token for token in TOKEN_RE.findall(segment) if token not in STOPWORDS and len(token) > 1]
+        terms.extend(tokens)
+        bigrams.extend(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    return terms + bigrams
+
+# Candidato ordenado: identificador, puntuación BM25 y palabras clave de la oferta que contiene
+class RankedResume:
+    __slots__ = ("doc_id", "score", "matched", "missing")
+
+    def __init__(self, doc_id, score, matched, missing):
+        self.doc_id = doc_id
+        self.score = score
+        self.matched = matched
+        self.missing = missing
+
+    @property
+    def coverage(self):
+        total = len(self.matched) + len(self.missing)
+        return len(self.matched) / total if total else 0.0
+
+# Índice BM25 incremental sobre los textos extraídos de los currículums.
+# Las listas de apariciones se guardan en arrays compactos y la puntuación se vectoriza con NumPy.
+class ResumeIndex:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self._positions = {}
+        self._lengths = array("f")
+        self._postings = {}
+        # Las vistas NumPy sobre los arrays impiden redimensionarlos: añadir y puntuar no se solapan
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._positions
+
+    # Añade un currículum al índice según se va cargando; volver a añadir el mismo id no hace nada
+    def add(self, doc_id, text):
+        terms = Counter(tokenize(text))
+        with self._lock:
+            return self._add(doc_id, terms)
+
+    def _add(self, doc_id, terms):
+        if doc_id in self._positions:
+            return self._positions[doc_id]
+        position = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self._positions[doc_id] = position
+
+        self._lengths.append(sum(terms.values()))
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("f"))
+            postings[0].append(position)
+            postings[1].append(frequency)
+        return position
+
+    def _idf(self, term):
+        postings = self._postings.get(term)
+        document_frequency = len(postings[0]) if postings else 0
+        return math.log(1 + (len(self.doc_ids) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    # Función para extraer las palabras clave (habilidades) de la oferta, ponderadas por su rareza en el corpus
+    def extract_keywords(self, job_description, limit=40):
+        frequencies = Counter(tokenize(job_description))
+        weighted = {}
+        for term, frequency in frequencies.items():
+            if any(word in JOB_STOPWORDS for word in term.split()):
+                continue
+            weight = frequency * (self._idf(term) if self.doc_ids else 1.0)
+            if TECH_TOKEN_RE.search(term):
+                weight *= 1.5
+            # Los bigramas sólo cuentan si aparecen en algún CV (evita "buscamos persona" y similares)
+            if " " in term and term not in self._postings:
+                continue
+            weighted[term] = weight
+        return sorted(weighted, key=weighted.get, reverse=True)[:limit]
+
+    # Puntuación BM25 de todos los currículums para una lista de términos (con repeticiones como peso)
+    def score(self, terms):
+        with self._lock:
+            return self._score(terms)
+
+    def _score(self, terms):
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        if not self.doc_ids:
+            return scores
+        lengths = np.frombuffer(self._lengths, dtype=np.float32)
+        average_length = float(lengths.mean()) or 1.0
+        # Normalización por longitud precalculada para todos los documentos
+        norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+
+        for term, query_weight in Counter(terms).items():
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            documents = np.frombuffer(postings[0], dtype=np.uint32)
+            frequencies = np.frombuffer(postings[1], dtype=np.float32)
+            contribution = self._idf(term) * frequencies * (self.k1 + 1) / (frequencies + norms[documents])
+            np.add.at(scores, documents, query_weight * contribution)
+        return scores
+
+    # Ordena todos los currículums frente a la oferta y devuelve los top_k mejores
+    def rank(self, job_description, top_k=None, keywords=None):
+        with self._lock:
+            return self._rank(job_description, top_k, keywords)
+
+    def _rank(self, job_description, top_k, keywords):
+        keywords = keywords if keywords is not None else self.extract_keywords(job_description)
+        scores = self._score(keywords)
+        count = len(scores) if top_k is None else min(top_k, len(scores))
+        if not count:
+            return []
+        # argpartition evita ordenar todo el corpus cuando sólo interesan los primeros
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        matches = {}
+        for keyword in keywords:
+            postings = self._postings.get(keyword)
+            present = np.frombuffer(postings[0], dtype=np.uint32) if postings else np.empty(0, dtype=np.uint32)
+            matches[keyword] = np.isin(top, present)
+
+        results = []
+        for rank, position in enumerate(top):
+            matched = [keyword for keyword in keywords if matches[keyword][rank]]
+            missing = [keyword for keyword in keywords if not matches[keyword][rank]]
+            results.append(RankedResume(self.doc_ids[position], float(scores[position]), matched, missing))
+        return results
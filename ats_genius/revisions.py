@@ -0,0 +1,116 @@
+import hashlib
+import json
+
+from .cache import normalize_job_description
+from .prompts import split_resume_sections
+from .scoring import EMAIL_RE, REPORT_WEIGHTS, compute_overall, find_phones
+
+# Función para identificar al candidato por su contacto (primer email o, si no hay, su teléfono).
+# Así se reconoce una nueva versión del mismo CV aunque llegue en otra sesión o por lotes.
+# Sin email ni teléfono verosímil no hay identidad: mejor no enlazar versiones que mezclar candidatos.
+def contact_identity(resume_text):
+    email = EMAIL_RE.search(resume_text or "")
+    if email:
+        return "email:" + email.group(0).lower()
+    phones = find_phones(resume_text)
+    if phones:
+        return "phone:" + "".join(char for char in phones[0] if char.isdigit())
+    return None
+
+# Función para construir la clave del historial de versiones: el mismo candidato (o sesión) contra la misma oferta
+def revision_key(resume_text, session_id, job_description, mode):
+    identity = contact_identity(resume_text) or (f"session:{session_id}" if session_id else None)
+    if identity is None:
+        return None
+    digest = hashlib.sha256("\n".join((identity, normalize_job_description(job_description), mode)).encode("utf-8"))
+    return "revision:" + digest.hexdigest()
+
+# Función para resumir cada sección del CV con un hash de su contenido; los encabezados repetidos se numeran
+def section_hashes(resume_text):
+    hashes = {}
+    for kind, heading, body in split_resume_sections(resume_text):
+        name = heading or "Cabecera"
+        label, count = name, 2
+        while label in hashes:
+            label, count = f"{name} ({count})", count + 1
+        hashes[label] = hashlib.sha256(" ".join(body.split()).encode("utf-8")).hexdigest()[:16]
+    return hashes
+
+# Función para guardar lo necesario de un análisis para compararlo con la siguiente versión
+def make_snapshot(cache_key, resume_text, scores):
+    scores = {name: round(score) for name, score in scores.items() if name in REPORT_WEIGHTS}
+    return {
+        "cache_key": cache_key,
+        "sections": section_hashes(resume_text),
+        "scores": scores,
+        "overall": compute_overall(scores),
+    }
+
+def _load(cache, key):
+    value = cache.get(key)
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+# Las instantáneas se guardan en la misma caché que los informes, junto a la clave del informe,
+# para poder mostrar los cambios también cuando el resultado se recupera de la caché
+def save_snapshot(cache, snapshot):
+    cache.put("snapshot:" + snapshot["cache_key"], json.dumps(snapshot))
+
+def load_snapshot(cache, cache_key):
+    return _load(cache, "snapshot:" + cache_key)
+
+def load_revision(cache, key):
+    return _load(cache, key)
+
+# Función para registrar la versión actual y devolver la anterior (None si es la primera).
+# Repetir el análisis de la misma versión no la convierte en su propia versión anterior.
+def record_revision(cache, key, snapshot):
+    entry = load_revision(cache, key) or {}
+    current = entry.get("current")
+    if current is not None and current.get("cache_key") == snapshot["cache_key"]:
+        previous = entry.get("previous")
+    else:
+        previous = current
+    cache.put(key, json.dumps({"current": snapshot, "previous": previous}))
+    return previous
+
+def _delta(before, after):
+    if before is None or after is None:
+        return f"{before if before is not None else '—'} → {after if after is not None else '—'}"
+    change = after - before
+    return f"{before} → {after} ({'+' if change >= 0 else ''}{change})"
+
+# Función para presentar los cambios respecto a la versión anterior del CV: puntuación general,
+# informes cuyo puntaje cambió, secciones modificadas y categorías reutilizadas sin llamar a Gemini
+def format_revision_delta(previous, current, reused=()):
+    lines = ["## 📈 Cambios respecto a la versión anterior", ""]
+    lines.append(f"**Puntuación general**: {_delta(previous.get('overall'), current.get('overall'))}")
+    lines.append("")
+
+    before, after = previous.get("scores", {}), current.get("scores", {})
+    changed = [name for name in REPORT_WEIGHTS if (name in before or name in after) and before.get(name) != after.get(name)]
+    for name in changed:
+        lines.append(f"- **{name}**: {_delta(before.get(name), after.get(name))}")
+    if not changed:
+        lines.append("- Ningún informe ha cambiado de puntaje.")
+
+    old_sections, new_sections = previous.get("sections", {}), current.get("sections", {})
+    modified = [name for name in new_sections if name in old_sections and old_sections[name] != new_sections[name]]
+    added = [name for name in new_sections if name not in old_sections]
+    removed = [name for name in old_sections if name not in new_sections]
+    lines.append("")
+    if modified:
+        lines.append(f"**Secciones modificadas**: {', '.join(modified)}")
+    if added:
+        lines.append(f"**Secciones nuevas**: {', '.join(added)}")
+    if removed:
+        lines.append(f"**Secciones eliminadas**: {', '.join(removed)}")
+    if not (modified or added or removed):
+        lines.append("**Secciones**: sin cambios en el texto")
+    if reused:
+        lines.append(f"\n*Reutilizado sin llamar a Gemini: {', '.join(reused)}*")
+    return "\n".join(lines)
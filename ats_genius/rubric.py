@@ -0,0 +1,138 @@
+import json
+import re
+
+from .prompts import EVALUATION_CATEGORY, INTERVIEW_CATEGORY, INTERVIEW_MIN_FIT, RUBRIC_CATEGORIES
+from .scoring import REPORT_WEIGHTS, format_overall_section
+
+# Objeto JSON de la respuesta (tolera bloques ```json y texto alrededor)
+JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+PENDING = "*⏳ Analizando...*"
+
+# Función para leer la respuesta JSON de una categoría; devuelve un diccionario vacío si no es válida
+def parse_category_response(text):
+    match = JSON_OBJECT_RE.search(text or "")
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+# Función para obtener los puntajes válidos (0-100) de los informes que corresponden a la categoría
+def category_scores(category, result):
+    scores = {}
+    raw_scores = result.get("scores") if isinstance(result.get("scores"), dict) else {}
+    for name, value in raw_scores.items():
+        if name not in category.reports:
+            continue
+        try:
+            scores[name] = max(0, min(100, float(value)))
+        except (TypeError, ValueError):
+            continue
+    return scores
+
+# Función para obtener la adecuación al puesto (1-10) de la evaluación final
+def fit_score(evaluation):
+    try:
+        return max(1, min(10, float((evaluation or {}).get("fit_score"))))
+    except (TypeError, ValueError):
+        return None
+
+def _items(result, key):
+    values = result.get(key)
+    if not isinstance(values, list):
+        return []
+    return [f"- {value.strip()}" for value in values if isinstance(value, str) and value.strip()]
+
+def _list_section(title, result, key):
+    items = _items(result, key)
+    return [f"**{title}**", *items, ""] if items else []
+
+# Función para presentar los factores que más suben y más bajan la puntuación general
+def format_overall_factors(scores):
+    impact = sorted(scores, key=lambda name: REPORT_WEIGHTS[name] * (scores[name] - 70))
+    negatives = [name for name in impact if scores[name] < 60][:3]
+    positives = [name for name in reversed(impact) if scores[name] >= 80][:3]
+    lines = []
+    if negatives:
+        lines.append("**Factores negativos**: " + ", ".join(f"{name} ({round(scores[name])})" for name in negatives))
+    if positives:
+        lines.append("**Factores positivos**: " + ", ".join(f"{name} ({round(scores[name])})" for name in positives))
+    return "\n\n".join(lines)
+
+def format_category(category, result, local_reports, error=None):
+    lines = [f"## {category.title}", ""]
+    if error is not None:
+        lines.append(f"*No disponible: {error}*")
+    elif result is None:
+        lines.append(PENDING)
+    for name in category.local_reports:
+        if name in local_reports:
+            report = local_reports[name]
+            lines.append(f"- **{name}** (local): {round(report.score)}/100 — {report.summary}")
+    if result is not None:
+        scores = category_scores(category, result)
+        for name in category.reports:
+            lines.append(f"- **{name}**: {round(scores[name])}/100" if name in scores else f"- **{name}**: sin puntaje")
+        lines.append("")
+        lines += _list_section("Hallazgos", result, "findings")
+        lines += _list_section("Recomendaciones", result, "recommendations")
+    return "\n".join(lines).rstrip()
+
+def format_evaluation(result, error=None):
+    lines = [f"## {EVALUATION_CATEGORY.title}", ""]
+    if error is not None:
+        return "\n".join(lines + [f"*No disponible: {error}*"])
+    if result is None:
+        return "\n".join(lines + [PENDING])
+    fit = fit_score(result)
+    lines += [f"**Adecuación General al Puesto: {fit:g}/10**" if fit is not None else "**Adecuación General al Puesto: no disponible**", ""]
+    lines += _list_section("Principales Puntos Fuertes y Cualificaciones", result, "strengths")
+    lines += _list_section("Lagunas Notables o Áreas de Mejora", result, "gaps")
+    lines += _list_section("Recomendaciones Específicas para Mejorar el Currículum", result, "recommendations")
+    if isinstance(result.get("verdict"), str) and result["verdict"].strip():
+        lines.append(f"**Veredicto Final**: {result['verdict'].strip()}")
+    return "\n".join(lines).rstrip()
+
+# La preparación para la entrevista depende de la evaluación final: sólo se pide si la adecuación es >= 7.
+# Si la evaluación falló, la entrevista tampoco está disponible (evaluation_error).
+def format_interview(evaluation, result, error=None, evaluation_error=None):
+    lines = [f"## {INTERVIEW_CATEGORY.title}", ""]
+    if evaluation_error is not None:
+        return "\n".join(lines + [f"*No disponible: falló la evaluación final ({evaluation_error})*"])
+    if evaluation is None:
+        return "\n".join(lines + [PENDING])
+    fit = fit_score(evaluation)
+    if fit is None:
+        return "\n".join(lines + ["*No disponible: no se obtuvo la adecuación al puesto.*"])
+    if fit < INTERVIEW_MIN_FIT:
+        return "\n".join(lines + [f"La adecuación al puesto ({fit:g}/10) es inferior a {INTERVIEW_MIN_FIT}: realice los cambios sugeridos y vuelva a presentar su CV."])
+    if error is not None:
+        return "\n".join(lines + [f"*No disponible: {error}*"])
+    if result is None:
+        return "\n".join(lines + [PENDING])
+    lines += _list_section("Preguntas que podría enfrentar", result, "questions")
+    lines += _list_section("Puntos clave a destacar", result, "key_points")
+    return "\n".join(lines).rstrip()
+
+# Función para combinar los resultados de las categorías en un único informe Markdown.
+# La puntuación general se calcula localmente con los puntajes disponibles en cada momento.
+def format_parallel_report(local_reports, results, errors):
+    llm_scores = {}
+    for category in RUBRIC_CATEGORIES:
+        if category.key in results:
+            llm_scores.update(category_scores(category, results[category.key]))
+
+    scores = {name: report.score for name, report in local_reports.items()}
+    scores.update(llm_scores)
+    overall = format_overall_section(local_reports, llm_scores)
+    factors = format_overall_factors(scores)
+    parts = [overall + ("\n\n" + factors if factors else "")]
+    for category in RUBRIC_CATEGORIES:
+        parts.append(format_category(category, results.get(category.key), local_reports, errors.get(category.key)))
+    parts.append(format_evaluation(results.get(EVALUATION_CATEGORY.key), errors.get(EVALUATION_CATEGORY.key)))
+    parts.append(format_interview(results.get(EVALUATION_CATEGORY.key), results.get(INTERVIEW_CATEGORY.key),
+                                  errors.get(INTERVIEW_CATEGORY.key), errors.get(EVALUATION_CATEGORY.key)))
+    return "\n\n".join(parts)
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import random
+import threading
+import time
+
+from . import metrics
+
+# Cuotas por clave API (por defecto, las del nivel gratuito de gemini-1.5-flash)
+DEFAULT_RPM = int(os.environ.get("ATS_GEMINI_RPM", 15))
+DEFAULT_TPM = int(os.environ.get("ATS_GEMINI_TPM", 1_000_000))
+DEFAULT_MAX_RETRIES = int(os.environ.get("ATS_GEMINI_MAX_RETRIES", 4))
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get("ATS_GEMINI_DEADLINE", 180))
+
+_retryable_errors = None
+
+# Errores transitorios de la API que merece la pena reintentar (429 y 5xx). Se resuelven en la primera
+# llamada para no cargar google.api_core al importar el módulo.
+def retryable_errors():
+    global _retryable_errors
+    if _retryable_errors is None:
+        from google.api_core import exceptions as api_exceptions
+
+        _retryable_errors = (
+            api_exceptions.TooManyRequests,
+            api_exceptions.ResourceExhausted,
+            api_exceptions.InternalServerError,
+            api_exceptions.BadGateway,
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.GatewayTimeout,
+            api_exceptions.DeadlineExceeded,
+            api_exceptions.Aborted,
+            ConnectionError,
+        )
+    return _retryable_errors
+
+# Función para estimar los tokens de un texto sin llamar a count_tokens (unos 4 caracteres por token)
+def estimate_tokens(*texts):
+    return sum(len(text or "") for text in texts) // 4 + 1
+
+# Cubeta de tokens: 'rate' unidades por minuto con ráfagas de hasta 'capacity'
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Reserva 'amount' unidades y devuelve cuánto hay que esperar antes de usarlas
+    def reserve(self, amount):
+        # Una petición mayor que la cubeta nunca cabría; se limita a la capacidad
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    # Devuelve unidades reservadas que al final no se usaron
+    def refund(self, amount):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(float(amount), self.capacity))
+
+# Limitador de una clave: peticiones por minuto y tokens por minuto
+class KeyRateLimiter:
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, estimated_tokens, deadline):
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if time.monotonic() + wait > deadline:
+            self.requests.refund(1)
+            self.tokens.refund(estimated_tokens)
+            raise TimeoutError("Se agotó el tiempo de espera por el límite de cuota de Gemini")
+        if wait:
+            time.sleep(wait)
+
+# Petición en curso compartida: el líder publica los fragmentos y los seguidores los reproducen
+class _Flight:
+    __slots__ = ("items", "done", "error", "condition")
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def append(self, item):
+        with self.condition:
+            self.items.append(item)
+            self.condition.notify_all()
+
+    def finish(self, error=None):
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+# Planificador de llamadas a Gemini: límite de cuota por clave, reintentos con backoff y jitter,
+# plazo máximo por petición y coalescencia de peticiones idénticas en curso
+class RequestScheduler:
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_retries=DEFAULT_MAX_RETRIES,
+                 deadline_seconds=DEFAULT_DEADLINE_SECONDS, base_delay=1.0, max_delay=30.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.deadline_seconds = deadline_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limiters = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    # Las claves no se guardan en claro como índice de los limitadores ni de las peticiones en curso
+    @staticmethod
+    def _key_id(api_key):
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def _limiter(self, api_key):
+        key_id = self._key_id(api_key)
+        with self._lock:
+            limiter = self._limiters.get(key_id)
+            if limiter is None:
+                limiter = self._limiters[key_id] = KeyRateLimiter(self.rpm, self.tpm)
+            return limiter
+
+    # Backoff exponencial con jitter completo
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # Ejecuta call(timeout) -> iterable y transmite sus elementos. Si ya hay una petición en curso
+    # con la misma flight_key y la misma clave API, se reutilizan sus elementos en lugar de llamar otra vez
+    # a la API. Con otra clave no se comparte: cada clave consume su cuota y recibe sus propios errores.
+    def stream(self, api_key, flight_key, call, estimated_tokens=1, trace=metrics.NULL_TRACE):
+        flight_key = (self._key_id(api_key), flight_key)
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[flight_key] = _Flight()
+
+        if is_leader:
+            yield from self._lead(api_key, flight_key, flight, call, estimated_tokens, trace)
+        else:
+            metrics.increment("ats_gemini_coalesced_total")
+            trace.set(coalesced=True)
+            yield from self._follow(flight)
+
+    def _lead(self, api_key, flight_key, flight, call, estimated_tokens, trace):
+        deadline = time.monotonic() + self.deadline_seconds
+        limiter = self._limiter(api_key)
+        error = RuntimeError("La petición a Gemini se canceló antes de terminar")
+        retryable = retryable_errors()
+        try:
+            attempt = 0
+            while True:
+                limiter.acquire(estimated_tokens, deadline)
+                emitted = False
+                try:
+                    for item in call(max(1.0, deadline - time.monotonic())):
+                        emitted = True
+                        flight.append(item)
+                        yield item
+                    error = None
+                    return
+                except retryable as e:
+                    # Sólo se reintenta si aún no se ha mostrado nada al usuario
+                    delay = self._backoff(attempt)
+                    if emitted or attempt >= self.max_retries or time.monotonic() + delay > deadline:
+                        raise
+                    attempt += 1
+                    metrics.increment("ats_gemini_retries_total", error=type(e).__name__)
+                    trace.add("retries", 1)
+                    time.sleep(delay)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(flight_key, None)
+            flight.finish(error)
+
+    def _follow(self, flight):
+        index = 0
+        while True:
+            with flight.condition:
+                while index >= len(flight.items) and not flight.done:
+                    flight.condition.wait()
+                items = flight.items[index:]
+                done, error = flight.done, flight.error
+            index += len(items)
+            yield from items
+            if done and index >= len(flight.items):
+                if error is not None:
+                    raise error
+                return
@@ -0,0 +1,300 @@
+import json
+import re
+from collections import Counter
+
+# Pesos (%) de cada informe en el OverallScoreReport, tal y como los define la rúbrica
+REPORT_WEIGHTS = {
+    "ATSParseRateReport": 15,
+    "QuantifyingImpactReport": 20,
+    "FormatAndSizeReport": 2,
+    "RepetitionReport": 5,
+    "SpellingGrammarReport": 10,
+    "LengthReporter": 1,
+    "BulletLengthReport": 0.5,
+    "DesignReport": 0.5,
+    "EmailReport": 2,
+    "PassiveVoiceReport": 2,
+    "BuzzwordsReport": 2,
+    "ContactReporter": 4,
+    "EssentialsReporter": 4,
+    "PersonalityReport": 1,
+    "AdditionalSectionsReport": 2,
+    "HardSkillsReport": 20,
+    "SoftSkillsReport": 10,
+}
+
+# Informes mecánicos que se calculan aquí; el resto los puntúa Gemini
+LOCAL_REPORTS = (
+    "LengthReporter", "BulletLengthReport", "EmailReport", "ContactReporter",
+    "RepetitionReport", "PassiveVoiceReport", "BuzzwordsReport", "FormatAndSizeReport",
+)
+LLM_REPORTS = tuple(name for name in REPORT_WEIGHTS if name not in LOCAL_REPORTS)
+
+MIN_WORDS, MAX_WORDS = 400, 800
+MIN_BULLET_WORDS, MAX_BULLET_WORDS = 5, 30
+MAX_FILE_SIZE = 2 * 1024 * 1024
+
+# Expresiones regulares precompiladas (una sola vez por proceso)
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Teléfonos: prefijo internacional y prefijo entre paréntesis opcionales y grupos de 2 a 4 cifras separados
+# por un solo espacio, punto o guion (sin cruzar líneas), o todas las cifras seguidas
+PHONE_RE = re.compile(r"(?<![\w/+])(?:\+\d{1,3}[ .-]?)?(?:\(\d{1,4}\)[ .-]?)?\d{2,4}(?:[ .-]?\d{2,4}){1,5}(?![\w/])")
+YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+LINKEDIN_RE = re.compile(r"linkedin\.com/(?:in|pub)/[\w%-]+", re.IGNORECASE)
+BULLET_RE = re.compile(r"^\s*(?:[•●▪◦■□➢►✓–—\-*·]|\d{1,2}[.)])\s*(.*)$")
+WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+QUANTIFIED_RE = re.compile(r"\d|%|\b(?:uno|dos|tres|cuatro|cinco|diez|cien|mil|millones?|one|two|three|ten|hundred|thousand|million)\b", re.IGNORECASE)
+PASSIVE_RE = re.compile(
+    r"\b(?:fue|fueron|fui|fuimos|ha sido|han sido|había sido|habían sido|será|serán)\s+(?:\w+mente\s+)?"
+    r"(?:\w+(?:ad|id)[oa]s?|hech[oa]s?|escrit[oa]s?|puest[oa]s?|abiert[oa]s?|resuelt[oa]s?|vist[oa]s?|dich[oa]s?)\b"
+    r"|\b(?:was|were|has been|have been|had been|is being|are being)\s+(?:\w+ly\s+)?"
+    r"(?:\w+ed|given|taken|done|made|built|led|written|shown|chosen|held|run|won|sold|taught)\b",
+    re.IGNORECASE,
+)
+
+BUZZWORDS = (
+    "sinergia", "proactivo", "proactiva", "dinámico", "dinámica", "orientado a resultados",
+    "orientada a resultados", "pensar fuera de la caja", "apasionado", "apasionada", "innovador",
+    "innovadora", "líder nato", "trabajo bajo presión", "motivado", "motivada", "multitarea",
+    "perfeccionista", "resolutivo", "resolutiva", "valor añadido", "sinérgico",
+    "synergy", "proactive", "dynamic", "results-driven", "results-oriented", "team player",
+    "go-getter", "think outside the box", "detail-oriented", "self-starter", "passionate",
+    "motivated", "hardworking", "hard-working", "best of breed", "guru", "ninja", "rockstar",
+    "thought leader", "value add",
+)
+BUZZWORDS_RE = re.compile(r"(?<!\w)(?:" + "|".join(re.escape(word) for word in BUZZWORDS) + r")(?!\w)", re.IGNORECASE)
+
+# Palabras poco profesionales en un email; se comparan palabras completas de la parte local ("angela.ruiz"
+# o "photo.studio" no cuentan), separadas por puntos, guiones, guiones bajos y cifras
+UNPROFESSIONAL_EMAIL_WORDS = frozenset("""
+party partygirl partyboy lover sexy crazy loco loca fiesta fiestero fiestera hot baby bebe xxx kiss kisses
+diablo diabla diablillo princesa princess guapo guapa cool
+""".split())
+EMAIL_WORD_SPLIT_RE = re.compile(r"[._+-]+|\d+")
+
+STOPWORDS = frozenset("""
+a al algo ante antes como con contra cual cuando de del desde donde durante e el ella ellos en entre era es esa
+ese eso esta este esto estos fue ha han hasta la las le les lo los mas me mi mis muy más ni no nos o otra otro para
+pero por que qué se ser si sin sobre su sus también tanto te tu un una uno unos y ya año años
+about after all also an and any are as at be been but by can for from had has have in into is it its more most not
+of on or our out over so than that the their them then there these they this to up was we were which while who
+will with within would you your
+""".split())
+
+# Resultado de un informe local: puntaje, resumen legible y fragmentos del texto que lo justifican
+class LocalReport:
+    __slots__ = ("name", "score", "summary", "findings")
+
+    def __init__(self, name, score, summary, findings=()):
+        self.name = name
+        self.score = int(round(max(0, min(100, score))))
+        self.summary = summary
+        self.findings = tuple(findings)
+
+# Función para obtener los bullets del texto; PyMuPDF suele dejar la viñeta sola en su propia línea
+def extract_bullets(text):
+    bullets = []
+    pending_marker = False
+    for line in text.splitlines():
+        match = BULLET_RE.match(line)
+        if match:
+            content = match.group(1).strip()
+            if content:
+                bullets.append(content)
+                pending_marker = False
+            else:
+                pending_marker = True
+        elif pending_marker and line.strip():
+            bullets.append(line.strip())
+            pending_marker = False
+    return bullets
+
+# Función para localizar los bullets que no cuantifican su impacto
+def find_unquantified_bullets(text):
+    return [bullet for bullet in extract_bullets(text) if not QUANTIFIED_RE.search(bullet)]
+
+def score_length(word_count):
+    if word_count < MIN_WORDS:
+        score = 100 * word_count / MIN_WORDS
+    elif word_count > MAX_WORDS:
+        score = 100 - (word_count - MAX_WORDS) / 8
+    else:
+        score = 100
+    return LocalReport("LengthReporter", score, f"{word_count} palabras (recomendado entre {MIN_WORDS} y {MAX_WORDS})")
+
+def score_bullet_length(bullets):
+    if not bullets:
+        return LocalReport("BulletLengthReport", 50, "No se detectaron bullets en el CV")
+    problems = [bullet for bullet in bullets if not MIN_BULLET_WORDS <= len(bullet.split()) <= MAX_BULLET_WORDS]
+    score = 100 * (len(bullets) - len(problems)) / len(bullets)
+    summary = f"{len(problems)} de {len(bullets)} bullets fuera del rango de {MIN_BULLET_WORDS}-{MAX_BULLET_WORDS} palabras"
+    return LocalReport("BulletLengthReport", score, summary, problems)
+
+def score_email(emails):
+    if not emails:
+        return LocalReport("EmailReport", 0, "No se encontró ningún email")
+    email = emails[0]
+    local_part = email.split("@", 1)[0]
+    score = 100
+    issues = []
+    if UNPROFESSIONAL_EMAIL_WORDS.intersection(EMAIL_WORD_SPLIT_RE.split(local_part.lower())):
+        score -= 50
+        issues.append("contiene términos poco profesionales")
+    if re.search(r"\d{3,}", local_part):
+        score -= 20
+        issues.append("contiene una serie larga de números")
+    if len(local_part) > 30:
+        score -= 10
+        issues.append("es demasiado largo")
+    summary = f"{email}: " + (", ".join(issues) if issues else "profesional")
+    return LocalReport("EmailReport", score, summary, [email] if issues else [])
+
+# Función para detectar un nombre propio en las primeras líneas del CV
+def _find_name(text):
+    for line in text.splitlines()[:5]:
+        words = line.strip().split()
+        if 2 <= len(words) <= 5 and all(word[:1].isupper() and WORD_RE.fullmatch(word.strip(".,")) for word in words):
+            return line.strip()
+    return None
+
+# Función para encontrar los teléfonos del texto. Sin prefijo internacional, dos grupos de 4 cifras que parecen
+# años ("2015-2020 2019") son un intervalo de fechas, no un teléfono.
+def find_phones(text):
+    phones = []
+    for match in PHONE_RE.findall(text or ""):
+        groups = re.findall(r"\d+", match)
+        if not 9 <= sum(len(group) for group in groups) <= 15:
+            continue
+        if not match.startswith("+") and sum(1 for group in groups if YEAR_RE.fullmatch(group)) >= 2:
+            continue
+        phones.append(match.strip())
+    return phones
+
+def score_contact(text, emails):
+    checks = {
+        "nombre": _find_name(text),
+        "email": emails[0] if emails else None,
+        "teléfono": (find_phones(text) or [None])[0],
+        "LinkedIn": (LINKEDIN_RE.findall(text) or [None])[0],
+    }
+    missing = [label for label, value in checks.items() if not value]
+    score = 100 * (len(checks) - len(missing)) / len(checks)
+    summary = "Faltan: " + ", ".join(missing) if missing else "Nombre, email, teléfono y LinkedIn presentes"
+    return LocalReport("ContactReporter", score, summary)
+
+def score_repetition(words, bullets):
+    content_words = [word for word in words if len(word) >= 4 and word not in STOPWORDS]
+    threshold = max(4, int(len(content_words) * 0.015))
+    overused = [(word, count) for word, count in Counter(content_words).most_common(10) if count > threshold]
+
+    # Verbos con los que empiezan los bullets: más de dos repeticiones se considera monótono
+    openers = Counter(bullet.split()[0].lower().strip(".,:;") for bullet in bullets if bullet.split())
+    repeated_openers = [(word, count) for word, count in openers.most_common() if count > 2]
+
+    score = 100 - 10 * len(overused) - 5 * sum(count - 2 for _, count in repeated_openers)
+    details = [f"{word} ({count})" for word, count in overused + repeated_openers]
+    summary = "Repeticiones excesivas: " + ", ".join(details) if details else "Sin repeticiones excesivas"
+    return LocalReport("RepetitionReport", score, summary, [word for word, _ in overused + repeated_openers])
+
+def score_passive_voice(text, bullets):
+    matches = [match.group(0) for match in PASSIVE_RE.finditer(text)]
+    units = max(len(bullets), len([line for line in text.splitlines() if len(line.split()) > 3]), 1)
+    # Un 25% o más de frases en pasiva deja el informe a cero
+    score = 100 * (1 - min(1, 4 * len(matches) / units))
+    summary = f"{len(matches)} construcciones en voz pasiva" + (": " + "; ".join(matches[:5]) if matches else "")
+    return LocalReport("PassiveVoiceReport", score, summary, matches)
+
+def score_buzzwords(text):
+    matches = [match.group(0) for match in BUZZWORDS_RE.finditer(text)]
+    score = 100 - 15 * len(matches)
+    unique = sorted(set(match.lower() for match in matches))
+    summary = f"{len(matches)} buzzwords" + (": " + ", ".join(unique) if unique else "")
+    return LocalReport("BuzzwordsReport", score, summary, matches)
+
+def score_format_and_size(file_size, metadata):
+    size_mb = file_size / (1024 * 1024)
+    # El PDF ya se ha podido abrir y leer, así que el formato es válido
+    score = 40
+    score += 40 if file_size < MAX_FILE_SIZE else 40 * MAX_FILE_SIZE / file_size
+    # creator y producer los rellena casi cualquier generador de PDF: sólo cuentan los que escribe el autor
+    extra_metadata = [key for key in ("author", "subject", "keywords") if (metadata or {}).get(key)]
+    score += 20 if not extra_metadata else 10
+    summary = f"PDF válido, {size_mb:.2f} MB (máximo 2 MB)"
+    summary += ", metadatos innecesarios: " + ", ".join(extra_metadata) if extra_metadata else ", sin metadatos innecesarios"
+    return LocalReport("FormatAndSizeReport", score, summary)
+
+# Función principal: calcula todos los informes mecánicos a partir del documento ya extraído
+def score_document(document):
+    text = document.text
+    words = [word.lower() for word in WORD_RE.findall(text)]
+    bullets = extract_bullets(text)
+    emails = EMAIL_RE.findall(text)
+
+    reports = (
+        score_length(document.word_count),
+        score_bullet_length(bullets),
+        score_email(emails),
+        score_contact(text, emails),
+        score_repetition(words, bullets),
+        score_passive_voice(text, bullets),
+        score_buzzwords(text),
+        score_format_and_size(document.file_size, document.metadata),
+    )
+    return {report.name: report for report in reports}
+
+# Función para presentar los informes locales como hechos dentro del prompt
+def format_local_facts(reports):
+    return "\n".join(f"        - {name}: {report.score}/100 ({report.summary})" for name, report in reports.items())
+
+# Función para leer los puntajes que Gemini devuelve en el bloque ```json final de su respuesta
+SCORES_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+def parse_llm_scores(text):
+    match = SCORES_BLOCK_RE.search(text)
+    if not match:
+        return {}, text
+    try:
+        raw_scores = json.loads(match.group(1))
+    except ValueError:
+        return {}, text
+
+    scores = {}
+    for name, value in raw_scores.items():
+        try:
+            scores[name] = max(0, min(100, float(value)))
+        except (TypeError, ValueError):
+            continue
+    return scores, (text[:match.start()] + text[match.end():]).rstrip()
+
+# Función para calcular la puntuación general como promedio ponderado de los informes disponibles
+def compute_overall(scores):
+    weighted = [(REPORT_WEIGHTS[name], score) for name, score in scores.items() if name in REPORT_WEIGHTS]
+    total_weight = sum(weight for weight, _ in weighted)
+    if not total_weight:
+        return None
+    return round(sum(weight * score for weight, score in weighted) / total_weight)
+
+# Función para presentar la puntuación general calculada localmente junto al detalle de cada informe
+def format_overall_section(local_reports, llm_scores):
+    scores = {name: report.score for name, report in local_reports.items()}
+    scores.update({name: score for name, score in llm_scores.items() if name in LLM_REPORTS})
+    overall = compute_overall(scores)
+
+    lines = ["## 🎯 Puntuación General (OverallScoreReport)", ""]
+    lines.append(f"**Puntuación: {overall}/100**" if overall is not None else "**Puntuación: no disponible**")
+    missing = [name for name in LLM_REPORTS if name not in scores]
+    if missing:
+        lines.append(f"\n*Calculada sin: {', '.join(missing)}*")
+    lines += ["", "| Informe | Puntaje | Peso | Origen |", "|---|---|---|---|"]
+    for name in REPORT_WEIGHTS:
+        if name in scores:
+            source = "Local" if name in local_reports else "Gemini"
+            lines.append(f"| {name} | {round(scores[name])} | {REPORT_WEIGHTS[name]}% | {source} |")
+    return "\n".join(lines)
+
+# Función para recuperar la puntuación general de un informe ya formateado (por ejemplo, en el modo por lotes)
+OVERALL_SCORE_RE = re.compile(r"\*\*Puntuación: (\d+)/100\*\*")
+
+def extract_overall_score(report):
+    match = OVERALL_SCORE_RE.search(report or "")
+    return int(match.group(1)) if match else None
@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from ats_genius import analysis, metrics
+from ats_genius.duplicates import DuplicateIndex, minhash_signature
+from ats_genius.ranking import ResumeIndex
+from ats_genius.scoring import extract_overall_score
+
+# Modos de análisis disponibles en lote (los mismos que ofrece la interfaz)
+MODES = ("job_description", "ats_general")
+
+# Columnas del informe de resultados
+RESULT_FIELDS = (
+    "id", "sha256", "mode", "status", "score", "rank", "relevance", "duplicate_of", "similarity",
+    "word_count", "page_count", "seconds", "report", "error",
+)
+
+# Estados que no hay que repetir al reanudar una ejecución interrumpida
+FINISHED_STATUSES = ("ok", "descartado")
+
+# Currículum pendiente de analizar: un PDF dentro de una carpeta o de un archivo zip
+class ResumeSource:
+    __slots__ = ("id", "_path", "_member")
+
+    def __init__(self, source_id, path, member=None):
+        self.id = source_id
+        self._path = path
+        self._member = member
+
+    def read(self):
+        if self._member is None:
+            with open(self._path, "rb") as fh:
+                return fh.read()
+        with zipfile.ZipFile(self._path) as archive:
+            return archive.read(self._member)
+
+# Función para enumerar los PDF de una carpeta (recursivamente) o de un zip, en orden estable
+def iter_resume_sources(path):
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            members = sorted(name for name in archive.namelist() if name.lower().endswith(".pdf"))
+        return [ResumeSource(name, path, name) for name in members]
+
+    sources = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                full_path = os.path.join(root, name)
+                sources.append(ResumeSource(os.path.relpath(full_path, path), full_path))
+    return sorted(sources, key=lambda source: source.id)
+
+# Función para recuperar los currículums ya procesados en una ejecución anterior
+def load_completed_ids(output_path):
+    if not os.path.exists(output_path):
+        return set()
+
+    completed = set()
+    with open(output_path, newline="", encoding="utf-8") as fh:
+        if output_path.lower().endswith(".csv"):
+            records = csv.DictReader(fh)
+        else:
+            records = []
+            for line in fh:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Última línea truncada por una caída: se vuelve a analizar
+                    continue
+        for record in records:
+            if record.get("status") in FINISHED_STATUSES:
+                completed.add(record.get("id"))
+    return completed
+
+# Escritor incremental de resultados en JSONL o CSV: cada registro se vuelca a disco al terminar
+class ResultWriter:
+    def __init__(self, output_path):
+        self.is_csv = output_path.lower().endswith(".csv")
+        write_header = self.is_csv and (not os.path.exists(output_path) or os.path.getsize(output_path) == 0)
+        self._fh = open(output_path, "a", newline="", encoding="utf-8")
+        if self.is_csv:
+            self._csv = csv.DictWriter(self._fh, fieldnames=RESULT_FIELDS)
+            if write_header:
+                self._csv.writeheader()
+
+    def write(self, record):
+        if self.is_csv:
+            self._csv.writerow(record)
+        else:
+            self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+# Función para leer y extraer un currículum; devuelve el registro y el documento (None si falla)
+def load_resume_source(source, mode):
+    started = time.perf_counter()
+    record = dict.fromkeys(RESULT_FIELDS)
+    record.update(id=source.id, mode=mode)
+    document = None
+    try:
+        data = source.read()
+        record["sha256"] = hashlib.sha256(data).hexdigest()
+        document = analysis.pdf_parser.parse(data)
+        record.update(word_count=document.word_count, page_count=document.page_count)
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record, document
+
+# CV casi idénticos de una misma ejecución: cada CV espera a que terminen los análisis en curso de los CV
+# casi idénticos anteriores y así reutiliza su informe, en lugar de pedir a Gemini lo mismo a la vez
+class DuplicateClaims:
+    def __init__(self):
+        self._index = DuplicateIndex()
+        self._finished = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def wait(self, source_id, resume_text):
+        signature = minhash_signature(resume_text)
+        with self._lock:
+            pending = [self._finished[match.doc_id] for match in self._index.query(signature)]
+            self._index.add(source_id, signature)
+            self._finished[source_id] = threading.Event()
+            self._sources.setdefault(analysis.resume_hash(resume_text), source_id)
+        for event in pending:
+            event.wait()
+
+    def release(self, source_id):
+        self._finished[source_id].set()
+
+    # Currículum de esta ejecución con ese texto (los de ejecuciones anteriores se identifican por su hash)
+    def source_of(self, resume_digest):
+        return self._sources.get(resume_digest, resume_digest)
+
+# Función para analizar un currículum con el mismo código de prompts, caché y planificador que la interfaz.
+# Cada análisis queda también en el historial, igual que los de la interfaz. Con claims, un CV casi idéntico
+# a otro ya analizado reutiliza su informe y el registro indica de cuál es copia.
+def analyze_document(record, document, job_description, api_key, mode, parallel=None, claims=None):
+    started = time.perf_counter()
+    if claims is not None:
+        claims.wait(record["id"], document.text)
+    # La traza se crea siempre: de ella salen los tiempos del historial y el CV cuyo informe se reutiliza
+    trace = metrics.start_trace(mode, force=True)
+    try:
+        if mode == "job_description":
+            stream = analysis.analyze_resume(job_description, document, api_key, trace=trace, parallel=parallel,
+                                             reuse_duplicates=claims is not None)
+        else:
+            stream = analysis.get_suggestions_from_gemini(document, api_key, trace=trace, reuse_duplicates=claims is not None)
+        report = ""
+        for report in stream:
+            pass
+        analysis.record_history(document, job_description if mode == "job_description" else "", mode, report, trace, record["id"])
+
+        status = analysis.analysis_status(report, trace)
+        if status == "error":
+            record.update(status="error", error=report)
+        elif status == "parcial":
+            # Se guarda el informe incompleto, pero cuenta como error: al reanudar se piden las categorías que fallaron
+            failed = ", ".join(trace.attributes.get("failed_categories", ()))
+            record.update(status="error", error=f"Análisis incompleto: fallaron las categorías {failed}", report=report)
+        else:
+            record.update(status="ok", score=extract_overall_score(report), report=report)
+        duplicate_of = trace.attributes.get("duplicate_of")
+        if duplicate_of is not None:
+            record.update(duplicate_of=claims.source_of(duplicate_of), similarity=trace.attributes.get("similarity"))
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    finally:
+        if claims is not None:
+            claims.release(record["id"])
+    trace.finish(record["status"])
+    record["seconds"] = round(record["seconds"] + time.perf_counter() - started, 3)
+    return record
+
+# Función para leer, extraer y analizar un currículum completo
+def process_source(source, job_description, api_key, mode, parallel=None, claims=None):
+    record, document = load_resume_source(source, mode)
+    if document is None:
+        return record
+    return analyze_document(record, document, job_description, api_key, mode, parallel, claims)
+
+# Ejecuta fn(item) en el pool con un límite de concurrencia y devuelve los resultados según terminan
+async def _bounded(items, fn, executor, concurrency):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(item):
+        async with semaphore:
+            return await loop.run_in_executor(executor, fn, item)
+
+    tasks = [asyncio.ensure_future(worker(item)) for item in items]
+    for future in asyncio.as_completed(tasks):
+        yield await future
+
+# Ejecuta el lote con un límite de concurrencia; los resultados se escriben según van terminando.
+# Con top_k, todos los currículums se ordenan primero localmente (BM25) frente a la oferta
+# y sólo los top_k mejores se envían a Gemini; el resto se registra como "descartado".
+# Con reuse_duplicates, los CV casi idénticos a otros ya analizados (en esta ejecución o en anteriores,
+# según el índice de duplicados guardado en disco) reutilizan su informe sin llamar a Gemini.
+async def run_batch(sources, job_description, api_key, mode, output_path, concurrency=4, top_k=None, parallel=None,
+                    reuse_duplicates=True):
+    completed = load_completed_ids(output_path)
+    pending = [source for source in sources if source.id not in completed]
+    if completed:
+        print(f"Reanudando: {len(sources) - len(pending)} currículums ya procesados.", file=sys.stderr)
+
+    writer = ResultWriter(output_path)
+    stats = {"ok": 0, "error": 0, "descartado": 0}
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    claims = DuplicateClaims() if reuse_duplicates else None
+    if reuse_duplicates:
+        analysis.duplicate_index = DuplicateIndex.load()
+
+    def analyze(item):
+        return analyze_document(item[0], item[1], job_description, api_key, mode, parallel, claims)
+
+    def process(source):
+        return process_source(source, job_description, api_key, mode, parallel, claims)
+
+    def load(source):
+        return load_resume_source(source, mode)
+
+    def emit(record, done, total):
+        writer.write(record)
+        stats[record["status"]] += 1
+        print(f"[{done}/{total}] {record['id']}: {record['status']} ({record['seconds']} s)", file=sys.stderr)
+
+    try:
+        if top_k is None:
+            async for record in _bounded(pending, process, executor, concurrency):
+                emit(record, sum(stats.values()) + 1, len(pending))
+            return stats
+
+        # Fase 1: extracción de todos los PDF e indexado incremental (también los ya procesados,
+        # para que el orden sea el mismo que en la ejecución original)
+        index = ResumeIndex()
+        loaded = {}
+        pending_ids = {source.id for source in pending}
+        async for record, document in _bounded(sources, load, executor, concurrency):
+            if document is not None:
+                index.add(record["id"], document.text)
+                if record["id"] in pending_ids:
+                    loaded[record["id"]] = (record, document)
+            elif record["id"] in pending_ids:
+                emit(record, sum(stats.values()) + 1, len(pending))
+
+        # Fase 2: ranking local en milisegundos; sólo los mejores pasan a Gemini
+        ranking = index.rank(job_description, top_k=None)
+        print(f"Ranking local de {len(ranking)} currículums; se analizan los {top_k} mejores.", file=sys.stderr)
+        selected = []
+        for position, ranked in enumerate(ranking, start=1):
+            if ranked.doc_id not in loaded:
+                continue
+            record, document = loaded.pop(ranked.doc_id)
+            record.update(rank=position, relevance=round(ranked.score, 4))
+            if position <= top_k:
+                selected.append((record, document))
+            else:
+                record["status"] = "descartado"
+                emit(record, sum(stats.values()) + 1, len(pending))
+
+        async for record in _bounded(selected, analyze, executor, concurrency):
+            emit(record, sum(stats.values()) + 1, len(pending))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+        analysis.history_store.flush()
+        if reuse_duplicates:
+            try:
+                analysis.duplicate_index.save()
+            except OSError as e:
+                print(f"No se pudo guardar el índice de duplicados: {e}", file=sys.stderr)
+    return stats
+
+# Función para leer la descripción del puesto desde un archivo o directamente del argumento
+def _read_job_description(value):
+    if value and os.path.isfile(value):
+        with open(value, encoding="utf-8") as fh:
+            return fh.read()
+    return value or ""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analiza en lote una carpeta o zip de currículums PDF con Gemini.")
+    parser.add_argument("source", help="Carpeta o archivo .zip con los currículums en PDF")
+    parser.add_argument("-j", "--job-description", help="Descripción del puesto (texto o ruta a un archivo)")
+    parser.add_argument("-o", "--output", default="resultados.jsonl", help="Archivo de resultados (.jsonl o .csv)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Análisis simultáneos como máximo")
+    parser.add_argument("--mode", choices=MODES, help="Tipo de análisis (por defecto, según haya descripción del puesto)")
+    parser.add_argument("-k", "--top-k", type=int, help="Ordenar localmente todos los CV y enviar a Gemini sólo los K mejores")
+    parser.add_argument("--parallel", action="store_true", default=None, help="Evaluar cada categoría de la rúbrica en una petición independiente")
+    parser.add_argument("--keep-duplicates", action="store_true", help="Analizar también los CV casi idénticos a otros ya analizados")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"), help="Clave API de Gemini (o GEMINI_API_KEY)")
+    args = parser.parse_args(argv)
+
+    job_description = _read_job_description(args.job_description)
+    mode = args.mode or ("job_description" if job_description else "ats_general")
+    if mode == "job_description" and not job_description:
+        parser.error("el modo job_description necesita --job-description")
+    if not args.api_key:
+        parser.error("proporcione una clave API de Gemini con --api-key o GEMINI_API_KEY")
+    if args.concurrency < 1:
+        parser.error("--concurrency debe ser al menos 1")
+    if args.top_k is not None and (args.top_k < 1 or mode != "job_description"):
+        parser.error("--top-k necesita una descripción del puesto y debe ser al menos 1")
+
+    sources = iter_resume_sources(args.source)
+    stats = asyncio.run(run_batch(sources, job_description, args.api_key, mode, args.output, args.concurrency, args.top_k, args.parallel,
+                                  not args.keep_duplicates))
+    print(f"Completado: {stats['ok']} correctos, {stats['descartado']} descartados, {stats['error']} con errores.", file=sys.stderr)
+    return 0 if stats["error"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import os
+import random
+
+import pymupdf as fitz
+
+# Fuentes base de PDF (no hace falta tener ningún archivo de fuente instalado): normal y negrita
+FONTS = (("helv", "hebo"), ("tiro", "tibo"), ("cour", "cobo"))
+
+# Contenido de ejemplo por idioma: encabezados, puestos, verbos de logro y habilidades
+LANGUAGES = {
+    "es": {
+        "headings": ("Perfil", "Experiencia", "Educación", "Habilidades", "Idiomas", "Proyectos"),
+        "roles": ("Desarrollador Backend", "Analista de Datos", "Jefe de Proyecto", "Ingeniero DevOps"),
+        "verbs": ("Lideré", "Reduje", "Automaticé", "Diseñé", "Implementé", "Optimicé", "Coordiné"),
+        "objects": ("el proceso de despliegue", "los informes de ventas", "la API de pagos",
+                    "el equipo de soporte", "la migración a la nube", "el tiempo de respuesta"),
+        "results": ("un {n}% en costes", "en {n} semanas", "para {n} clientes", "con un ahorro de {n}.000 €"),
+        "profile": "Profesional con {n} años de experiencia orientado a resultados y a la mejora continua.",
+        "page": "Página {page} de {pages}",
+    },
+    "en": {
+        "headings": ("Summary", "Experience", "Education", "Skills", "Languages", "Projects"),
+        "roles": ("Backend Developer", "Data Analyst", "Project Manager", "DevOps Engineer"),
+        "verbs": ("Led", "Reduced", "Automated", "Designed", "Implemented", "Optimized", "Coordinated"),
+        "objects": ("the deployment pipeline", "the sales reporting", "the payments API",
+                    "the support team", "the cloud migration", "the response time"),
+        "results": ("by {n}%", "in {n} weeks", "for {n} customers", "saving ${n},000 per year"),
+        "profile": "Results-driven professional with {n} years of experience and a focus on continuous improvement.",
+        "page": "Page {page} of {pages}",
+    },
+    "pt": {
+        "headings": ("Resumo", "Experiência", "Formação", "Competências", "Idiomas", "Projetos"),
+        "roles": ("Desenvolvedor Backend", "Analista de Dados", "Gerente de Projetos", "Engenheiro DevOps"),
+        "verbs": ("Liderei", "Reduzi", "Automatizei", "Projetei", "Implementei", "Otimizei", "Coordenei"),
+        "objects": ("o processo de implantação", "os relatórios de vendas", "a API de pagamentos",
+                    "a equipe de suporte", "a migração para a nuvem", "o tempo de resposta"),
+        "results": ("em {n}%", "em {n} semanas", "para {n} clientes", "com economia de R$ {n}.000"),
+        "profile": "Profissional com {n} anos de experiência focado em resultados e melhoria contínua.",
+        "page": "Página {page} de {pages}",
+    },
+    "fr": {
+        "headings": ("Profil", "Expérience", "Formation", "Compétences", "Langues", "Projets"),
+        "roles": ("Développeur Backend", "Analyste de Données", "Chef de Projet", "Ingénieur DevOps"),
+        "verbs": ("Dirigé", "Réduit", "Automatisé", "Conçu", "Mis en place", "Optimisé", "Coordonné"),
+        "objects": ("le pipeline de déploiement", "les rapports de ventes", "l'API de paiement",
+                    "l'équipe support", "la migration vers le cloud", "le temps de réponse"),
+        "results": ("de {n} %", "en {n} semaines", "pour {n} clients", "avec une économie de {n} 000 €"),
+        "profile": "Professionnel avec {n} ans d'expérience, orienté résultats et amélioration continue.",
+        "page": "Page {page} sur {pages}",
+    },
+}
+
+SKILLS = (
+    "Python", "SQL", "Docker", "Kubernetes", "AWS", "Azure", "Terraform", "React", "Node.js", "Java",
+    "Power BI", "Excel", "Scrum", "Git", "CI/CD", "PostgreSQL", "Pandas", "FastAPI", "Linux", "Jira",
+)
+
+NAMES = ("Ana García", "John Smith", "Maria Silva", "Claire Dubois", "Luis Pérez", "Emily Johnson")
+
+# Descripción del puesto usada en las pruebas de extremo a extremo
+JOB_DESCRIPTION = """Buscamos un Desarrollador Backend con experiencia en Python, SQL, Docker y AWS.
+Requisitos: 3 años de experiencia, conocimientos de CI/CD, Kubernetes y PostgreSQL.
+Valorable: FastAPI, Terraform y experiencia liderando equipos con metodologías Scrum."""
+
+# Función para generar las líneas de contenido de un CV sintético en un idioma
+def _resume_lines(rng, language, line_count):
+    content = LANGUAGES[language]
+    name = rng.choice(NAMES)
+    lines = [
+        ("title", name),
+        ("text", f"{rng.choice(content['roles'])} | {name.split()[0].lower()}@example.com | +34 600 {rng.randint(100, 999)} {rng.randint(100, 999)}"),
+        ("heading", content["headings"][0]),
+        ("text", content["profile"].format(n=rng.randint(2, 15))),
+    ]
+    while len(lines) < line_count:
+        heading = rng.choice(content["headings"][1:])
+        lines.append(("heading", heading))
+        if heading == content["headings"][3]:
+            lines.append(("text", ", ".join(rng.sample(SKILLS, rng.randint(5, 10)))))
+            continue
+        lines.append(("text", f"{rng.choice(content['roles'])} · {rng.randint(2008, 2020)} - {rng.randint(2021, 2025)}"))
+        for _ in range(rng.randint(3, 6)):
+            result = rng.choice(content["results"]).format(n=rng.randint(2, 90))
+            lines.append(("bullet", f"• {rng.choice(content['verbs'])} {rng.choice(content['objects'])} {result}."))
+    return lines[:line_count]
+
+# Función para crear un PDF sintético: páginas, fuentes, tamaños, columnas, imágenes e idioma variables
+def make_resume_pdf(rng, pages=1, language="es", font=FONTS[0], font_size=10.5, columns=1, image_kb=0):
+    doc = fitz.open()
+    width, height = fitz.paper_size("a4")
+    margin = 50
+    line_height = font_size * 1.4
+    lines_per_column = int((height - 2 * margin - 30) / line_height)
+    lines = _resume_lines(rng, language, lines_per_column * columns * pages)
+    column_width = (width - 2 * margin) / columns
+
+    for page_number in range(pages):
+        page = doc.new_page(width=width, height=height)
+        start = page_number * lines_per_column * columns
+        for index, (kind, text) in enumerate(lines[start:start + lines_per_column * columns]):
+            column, row = divmod(index, lines_per_column)
+            x = margin + column * column_width
+            y = margin + (row + 1) * line_height
+            size = font_size * (1.6 if kind == "title" else 1.15 if kind == "heading" else 1)
+            fontname = font[1] if kind in ("title", "heading") else font[0]
+            # El texto se recorta al ancho de la columna para que las columnas no se solapen
+            max_chars = int(column_width / (size * 0.5))
+            page.insert_text((x, y), text[:max_chars], fontname=fontname, fontsize=size,
+                             color=(0.1, 0.2, 0.5) if kind == "heading" else (0, 0, 0))
+        footer = LANGUAGES[language]["page"].format(page=page_number + 1, pages=pages)
+        page.insert_text((width / 2 - 30, height - margin / 2), footer, fontname=font[0], fontsize=8)
+
+    # Una foto de ruido aleatorio (no comprimible) hace crecer el archivo sin añadir texto
+    if image_kb:
+        side = max(8, int((image_kb * 1024 / 3) ** 0.5))
+        pixmap = fitz.Pixmap(fitz.csRGB, side, side, rng.randbytes(side * side * 3), False)
+        doc[0].insert_image(fitz.Rect(width - margin - 70, margin - 10, width - margin, margin + 60), pixmap=pixmap)
+
+    doc.set_metadata({"title": "Curriculum Vitae", "author": lines[0][1]})
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data
+
+# Función para generar (o reutilizar) un corpus reproducible de CV en una carpeta; devuelve las rutas
+def generate_corpus(directory, count=24, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        options = {
+            "pages": rng.choice((1, 1, 2, 2, 3, 4)),
+            "language": rng.choice(tuple(LANGUAGES)),
+            "font": rng.choice(FONTS),
+            "font_size": rng.choice((9, 10, 10.5, 11, 12)),
+            "columns": rng.choice((1, 1, 2)),
+            "image_kb": rng.choice((0, 0, 50, 400, 1500)),
+        }
+        name = (f"cv_{index:03d}_{options['language']}_{options['pages']}p_{options['font'][0]}"
+                f"_{options['columns']}col_{options['image_kb']}kb.pdf")
+        path = os.path.join(directory, name)
+        # El contenido depende sólo de la semilla y del índice: se regenera igual en cada ejecución
+        document_rng = random.Random(f"{seed}-{index}")
+        if not os.path.exists(path):
+            data = make_resume_pdf(document_rng, **options)
+            with open(path + ".tmp", "wb") as fh:
+                fh.write(data)
+            os.replace(path + ".tmp", path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import random
+import threading
+import time
+
+from google.api_core import exceptions as api_exceptions
+
+from ats_genius.prompts import (
+    ATS_GENERAL_SECTIONS, ATS_GENERAL_SYSTEM_INSTRUCTION, EVALUATION_CATEGORY, INTERVIEW_CATEGORY,
+    JOB_DESCRIPTION_SECTIONS, RUBRIC_CATEGORIES,
+)
+from ats_genius.scheduler import estimate_tokens
+from ats_genius.scoring import LLM_REPORTS
+
+# Metadatos de uso con los mismos campos que devuelve la API real
+class FakeUsage:
+    __slots__ = ("prompt_token_count", "cached_content_token_count", "candidates_token_count", "total_token_count")
+
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.cached_content_token_count = 0
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+class FakeChunk:
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+# Respuesta en streaming: los fragmentos llegan con la latencia configurada al iterarla
+class FakeResponse:
+    def __init__(self, backend, pieces, prompt_tokens, fail_at):
+        self._backend = backend
+        self._pieces = pieces
+        self._prompt_tokens = prompt_tokens
+        self._fail_at = fail_at
+        self.usage_metadata = None
+
+    def __iter__(self):
+        for index, piece in enumerate(self._pieces):
+            if index == self._fail_at:
+                self._backend._count("stream_errors")
+                raise api_exceptions.InternalServerError("Error simulado durante el streaming")
+            if index:
+                time.sleep(self._backend.chunk_delay)
+            yield FakeChunk(piece)
+        self.usage_metadata = FakeUsage(self._prompt_tokens, estimate_tokens(*self._pieces))
+
+    # Respuesta sin streaming: se espera a que termine la generación completa
+    @property
+    def text(self):
+        return "".join(chunk.text for chunk in self)
+
+# Modelo falso con la misma interfaz que genai.GenerativeModel que usa la aplicación
+class FakeModel:
+    def __init__(self, backend, system_instruction):
+        self._backend = backend
+        self._system_instruction = system_instruction or ""
+
+    def generate_content(self, prompt, stream=False, request_options=None, generation_config=None):
+        return self._backend.generate(self._system_instruction, prompt)
+
+# Sustituto local de la API de Gemini con latencia, streaming y tasas de error configurables.
+# Se inyecta en GeminiClientPool mediante sus fábricas de cliente y de modelo.
+class FakeGeminiBackend:
+    # chunk_chars / chunk_delay es la velocidad de generación simulada (por defecto, unos 1000 tokens/s)
+    def __init__(self, latency=0.5, jitter=0.2, chunk_delay=0.01, chunk_chars=40,
+                 error_rate=0.0, rate_limit_rate=0.0, stream_error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_error_rate = stream_error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "rate_limited": 0, "stream_errors": 0}
+        self._categories = {
+            category.system_instruction: category
+            for category in RUBRIC_CATEGORIES + (EVALUATION_CATEGORY, INTERVIEW_CATEGORY)
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _draw(self):
+        with self._lock:
+            return self._random.random(), self._random.random(), self._random.random(), self._random.random()
+
+    # Fábricas compatibles con GeminiClientPool
+    def create_client(self, api_key):
+        return object()
+
+    def create_model(self, client, model_name, system_instruction):
+        return FakeModel(self, system_instruction)
+
+    # Respuesta JSON de una categoría del análisis en paralelo
+    def _category_report(self, category, seed):
+        sentence = "El candidato muestra resultados medibles en el área evaluada."
+        if category is EVALUATION_CATEGORY:
+            result = {"fit_score": 4 + seed % 7, "strengths": [sentence] * 3, "gaps": [sentence] * 2,
+                      "recommendations": [sentence] * 3, "verdict": sentence}
+        elif category is INTERVIEW_CATEGORY:
+            result = {"questions": ["¿Puedes hablarnos de un proyecto en el que hayas trabajado?"] * 3, "key_points": [sentence] * 3}
+        else:
+            result = {"scores": {name: 40 + (seed >> index) % 60 for index, name in enumerate(category.reports)},
+                      "findings": [sentence] * 3, "recommendations": [sentence] * 3}
+        return json.dumps(result, ensure_ascii=False)
+
+    # Informe con los encabezados que espera la barra de progreso y el bloque JSON de puntajes
+    def _report(self, system_instruction, prompt):
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:4], "big")
+        if system_instruction in self._categories:
+            return self._category_report(self._categories[system_instruction], seed)
+        is_ats = system_instruction == ATS_GENERAL_SYSTEM_INSTRUCTION
+        sections = ATS_GENERAL_SECTIONS if is_ats else JOB_DESCRIPTION_SECTIONS
+        scores = {name: 40 + (seed >> index) % 60 for index, name in enumerate(LLM_REPORTS)}
+        parts = []
+        for section in sections:
+            parts.append(f"## {section}\n\n" + "El candidato muestra resultados medibles en el área evaluada. " * 8)
+        scores_block = "```json\n" + json.dumps(scores) + "\n```"
+        if is_ats:
+            parts.insert(len(parts) - 1, scores_block)
+        else:
+            parts.append(scores_block)
+        return "\n\n".join(parts)
+
+    def generate(self, system_instruction, prompt):
+        self._count("calls")
+        error_draw, rate_draw, stream_draw, jitter_draw = self._draw()
+        time.sleep(max(0.0, self.latency + self.jitter * (2 * jitter_draw - 1)))
+        if rate_draw < self.rate_limit_rate:
+            self._count("rate_limited")
+            raise api_exceptions.ResourceExhausted("Cuota simulada agotada (429)")
+        if error_draw < self.error_rate:
+            self._count("errors")
+            raise api_exceptions.ServiceUnavailable("Error simulado del servidor (503)")
+
+        report = self._report(system_instruction, prompt)
+        size = max(1, self.chunk_chars)
+        pieces = [report[start:start + size] for start in range(0, len(report), size)]
+        # Los fallos a mitad de respuesta no se reintentan: el usuario ya ha visto parte del informe
+        fail_at = len(pieces) // 2 if stream_draw < self.stream_error_rate else None
+        return FakeResponse(self, pieces, estimate_tokens(system_instruction, prompt), fail_at)
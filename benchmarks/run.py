@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ats_genius import analysis
+from ats_genius.cache import ResultCache
+from ats_genius.clients import GeminiClientPool
+from ats_genius.history import AnalysisHistory
+from ats_genius.ingestion import calculate_metrics, extract_text_from_pdf, load_resume_document
+from ats_genius.prompts import build_job_description_prompt, clean_resume_text
+from ats_genius.scheduler import RequestScheduler
+from ats_genius.scoring import format_local_facts, score_document
+from benchmarks.corpus import JOB_DESCRIPTION, generate_corpus
+from benchmarks.fake_gemini import FakeGeminiBackend
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".benchmarks")
+
+# Métricas en las que un valor mayor es peor (latencias) y en las que un valor menor es peor (rendimiento)
+LATENCY_METRICS = ("p50", "p95")
+THROUGHPUT_METRICS = ("rps",)
+
+# Función para calcular un percentil con interpolación lineal entre los valores ordenados
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+# Función para resumir las latencias de una etapa: percentiles, media y peticiones por segundo
+def summarize(latencies, elapsed, errors=0):
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "p50": round(percentile(latencies, 50), 6),
+        "p95": round(percentile(latencies, 95), 6),
+        "mean": round(sum(latencies) / len(latencies), 6) if latencies else 0.0,
+        "rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+    }
+
+# Función para medir fn(item) sobre todos los elementos de forma secuencial
+def time_stage(items, fn, repeat=1):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+# Función para construir el prompt completo de un CV ya cargado (la parte local previa a Gemini)
+def build_prompt(document):
+    local_facts = format_local_facts(score_document(document))
+    return build_job_description_prompt(clean_resume_text(document.pages), JOB_DESCRIPTION, analysis.describe_document(document), local_facts)
+
+# Función para ejecutar process_based_on_option de principio a fin con 'concurrency' peticiones simultáneas
+def run_end_to_end(paths, requests, concurrency, parallel=False):
+    errors = 0
+    latencies = []
+    first_chunk = []
+
+    def request(index):
+        # Una descripción distinta por petición: ni la caché ni la coalescencia ocultan el coste real
+        job_description = f"{JOB_DESCRIPTION}\nReferencia {time.time_ns()}-{index}"
+        start = time.perf_counter()
+        first = None
+        text = ""
+        for text in analysis.process_based_on_option("Analizar con descripción de puesto", paths[index % len(paths)],
+                                                     job_description, "clave-benchmark", parallel=parallel):
+            if first is None:
+                first = time.perf_counter() - start
+        return time.perf_counter() - start, first, isinstance(text, analysis.ErrorMessage)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, first, failed in executor.map(request, range(requests)):
+            latencies.append(latency)
+            first_chunk.append(first or latency)
+            errors += failed
+    summary = summarize(latencies, time.perf_counter() - started, errors)
+    summary["first_chunk_p50"] = round(percentile(first_chunk, 50), 6)
+    return summary
+
+# Función para sustituir Gemini, la caché y el planificador de la aplicación por sus versiones de prueba
+def install_fake_backend(backend, cache_path):
+    analysis.gemini_pool = GeminiClientPool(client_factory=backend.create_client, model_factory=backend.create_model)
+    analysis.result_cache = ResultCache(cache_path)
+    analysis.history_store = AnalysisHistory(os.path.join(os.path.dirname(cache_path), "history.sqlite3"))
+    # Sin límite de cuota y con esperas cortas entre reintentos: se mide la aplicación, no la cuota
+    analysis.request_scheduler = RequestScheduler(rpm=10 ** 6, tpm=10 ** 9, base_delay=0.05, max_delay=0.5)
+
+# Función para obtener el commit actual, si el benchmark se ejecuta dentro del repositorio git
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Función para leer la última ejecución del historial con la misma configuración
+def load_previous(history_path, config):
+    if not os.path.exists(history_path):
+        return None
+    previous = None
+    with open(history_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if run.get("config") == config:
+                previous = run
+    return previous
+
+# Función para comparar dos ejecuciones: devuelve las filas de la tabla y las regresiones encontradas.
+# Las diferencias por debajo de min_delta segundos se ignoran para no confundir ruido con regresiones.
+def compare(previous, current, threshold, min_delta=0.001):
+    rows = []
+    regressions = []
+    for stage, summary in current.items():
+        before = previous.get(stage) if previous else None
+        for metric in LATENCY_METRICS + THROUGHPUT_METRICS:
+            value = summary[metric]
+            old = before.get(metric) if before else None
+            change = (value - old) / old if old else None
+            regressed = False
+            if change is not None and metric in LATENCY_METRICS:
+                regressed = change > threshold and value - old > min_delta
+            elif change is not None:
+                regressed = change < -threshold
+            rows.append((stage, metric, old, value, change, regressed))
+            if regressed:
+                regressions.append(f"{stage} {metric}: {old} → {value} ({change:+.0%})")
+    return rows, regressions
+
+def print_report(rows):
+    print(f"{'Etapa':<28} {'Métrica':<8} {'Anterior':>12} {'Actual':>12} {'Cambio':>8}")
+    for stage, metric, old, value, change, regressed in rows:
+        old_text = "-" if old is None else f"{old:.4f}"
+        change_text = "-" if change is None else f"{change:+.0%}"
+        flag = "  ⚠ regresión" if regressed else ""
+        print(f"{stage:<28} {metric:<8} {old_text:>12} {value:>12.4f} {change_text:>8}{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide la latencia y el rendimiento de ATS Genius sin consumir cuota de Gemini.")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY, help="Carpeta del corpus sintético y del historial")
+    parser.add_argument("--documents", type=int, default=24, help="CV sintéticos del corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del corpus y del backend simulado")
+    parser.add_argument("--concurrency", default="1,4,8,16", help="Niveles de concurrencia separados por comas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones de las etapas locales (extracción y prompt)")
+    parser.add_argument("--requests", type=int, default=32, help="Peticiones de extremo a extremo por nivel")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latencia simulada hasta el primer fragmento (s)")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Tiempo simulado entre fragmentos de 40 caracteres (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de llamadas con error 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Proporción de llamadas con error 429")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Proporción de respuestas que fallan a mitad")
+    parser.add_argument("--parallel", action="store_true", help="Usar el análisis en paralelo por categorías")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Empeoramiento relativo que cuenta como regresión")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Terminar con código 1 si hay regresiones")
+    parser.add_argument("--no-history", action="store_true", help="No guardar esta ejecución en el historial")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    config = {
+        "documents": args.documents, "seed": args.seed, "concurrency": levels, "repeat": args.repeat, "requests": args.requests,
+        "latency": args.latency, "chunk_delay": args.chunk_delay, "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate, "stream_error_rate": args.stream_error_rate,
+        "parallel": args.parallel,
+    }
+
+    paths = generate_corpus(os.path.join(args.directory, f"corpus-{args.seed}"), args.documents, args.seed)
+    backend = FakeGeminiBackend(args.latency, chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, stream_error_rate=args.stream_error_rate, seed=args.seed)
+
+    results = {}
+    print(f"Corpus: {len(paths)} PDF en {os.path.dirname(paths[0])}", file=sys.stderr)
+    results["extract_text_from_pdf"] = time_stage(paths, extract_text_from_pdf, args.repeat)
+    texts = {path: extract_text_from_pdf(path) for path in paths}
+
+    def metrics(path):
+        return calculate_metrics(path, texts[path])
+
+    results["calculate_metrics"] = time_stage(paths, metrics, args.repeat)
+    documents = [load_resume_document(path) for path in paths]
+    results["prompt_construction"] = time_stage(documents, build_prompt, args.repeat * 5)
+
+    with tempfile.TemporaryDirectory() as cache_directory:
+        install_fake_backend(backend, os.path.join(cache_directory, "results.sqlite3"))
+        # Calentamiento: arranque de los procesos de análisis de PDF y del pool de clientes
+        run_end_to_end(paths, max(levels), max(levels), args.parallel)
+        for level in levels:
+            print(f"Extremo a extremo con concurrencia {level}...", file=sys.stderr)
+            results[f"end_to_end@c{level}"] = run_end_to_end(paths, args.requests, level, args.parallel)
+        analysis.result_cache.close()
+        analysis.history_store.close()
+
+    history_path = os.path.join(args.directory, "history.jsonl")
+    previous = load_previous(history_path, config)
+    rows, regressions = compare(previous["results"] if previous else None, results, args.threshold)
+    print_report(rows)
+    for stage, summary in results.items():
+        if summary["errors"]:
+            print(f"{stage}: {summary['errors']} de {summary['count']} peticiones terminaron con error", file=sys.stderr)
+    print(f"Llamadas simuladas a Gemini: {backend.stats}", file=sys.stderr)
+    if previous:
+        print(f"Comparado con la ejecución del {previous['timestamp']} (commit {previous.get('commit') or '-'}).", file=sys.stderr)
+
+    if not args.no_history:
+        run = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": _git_commit(), "config": config, "results": results}
+        os.makedirs(args.directory, exist_ok=True)
+        with open(history_path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(run) + "\n")
+
+    if regressions:
+        print("Regresiones:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())